@@ -0,0 +1,9 @@
+"""Text-processing engines behind the FilterPipes filters.
+
+These modules are plain Python with no dependency on the SublimeText
+API, so they can be loaded on their own by the headless tools.
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
@@ -0,0 +1,173 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Base64 encoding and decoding of text, a block at a time.
+
+Text is converted in blocks of a few hundred KB, cut at multiples of 3
+input bytes (and of whole output lines) when encoding and of 4 Base64
+characters when decoding, so each block converts independently and
+only one block's worth of intermediate bytes exists at a time. Within a
+block the work is done by binascii, translate tables and a compiled
+regex rather than Python loops.
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import binascii
+import codecs
+import re
+
+BLOCK_SIZE = 3 * 64 * 2048  # input bytes per block when encoding
+
+_ALPHABET = (b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+             b'0123456789+/=')
+
+
+def _byte_table(mapping):
+    table = bytearray(range(256))
+    for before, after in zip(bytearray(mapping[0]), bytearray(mapping[1])):
+        table[before] = after
+    return bytes(table)
+
+
+_TO_URLSAFE = _byte_table((b'+/', b'-_'))
+_FROM_URLSAFE = _byte_table((b'-_', b'+/'))
+_WHITESPACE = b' \t\n\r\v\f'
+_lines = {}  # wrap -> compiled regex splitting a block into lines
+
+
+def _line_splitter(wrap):
+    splitter = _lines.get(wrap)
+    if splitter is None:
+        splitter = _lines[wrap] = re.compile(
+            ('.{1,%d}' % wrap).encode('ascii'), re.S).findall
+    return splitter
+
+
+def encode(text, wrap=64, urlsafe=False, padding=True, encoding='UTF-8',
+           block_size=BLOCK_SIZE):
+    """Base64-encodes the bytes of text in the given encoding.
+
+    Args:
+      text: string to encode.
+      wrap: line length of the output; 0 or None for a single line.
+      urlsafe: use "-" and "_" instead of "+" and "/".
+      padding: end with "=" to a multiple of 4 characters.
+
+    Returns:
+      the encoded string, with no trailing newline.
+    """
+    wrap = int(wrap or 0)
+    # whole output lines per block: 3 bytes in are 4 characters out
+    unit = 3 * wrap if wrap else 3
+    step = max(block_size // unit, 1) * unit
+    split = _line_splitter(wrap) if wrap else None
+
+    def encode_block(block):
+        encoded = binascii.b2a_base64(block)[:-1]  # drop its newline
+        if urlsafe:
+            encoded = encoded.translate(_TO_URLSAFE)
+        if not padding:
+            encoded = encoded.rstrip(b'=')  # only the last block has any
+        if split is not None:
+            encoded = b'\n'.join(split(encoded))
+        pieces.append(encoded.decode('ascii'))
+
+    pieces = []
+    pending = b''
+    for pos in range(0, len(text), step):
+        pending += text[pos:pos + step].encode(encoding)
+        usable = len(pending) - len(pending) % step
+        if usable:
+            encode_block(pending[:usable])
+            pending = pending[usable:]
+    if pending:
+        encode_block(pending)
+    return ('\n' if wrap else '').join(pieces)
+
+
+def _invalid(what):
+    return ValueError('FilterPipes: invalid Base64: %s' % what)
+
+
+def _clean(chunk):
+    """A chunk of Base64 text as standard-alphabet bytes, minus whitespace."""
+    try:
+        data = chunk.encode('ascii')
+    except UnicodeEncodeError as e:
+        raise _invalid('unexpected %r' % chunk[e.start])
+    data = data.translate(_FROM_URLSAFE, _WHITESPACE)
+    junk = data.translate(None, _ALPHABET)
+    if junk:
+        raise _invalid('unexpected %r' % junk[:1].decode('ascii'))
+    return data
+
+
+def _complete(data):
+    """Splits data (starting on a 4-character group) into the parts that
+    can be decoded now, ending at each padded group, and the rest."""
+    parts = []
+    start = 0
+    while True:
+        pad = data.find(b'=', start)
+        if pad < 0:
+            break
+        end = pad - (pad - start) % 4 + 4
+        if (pad - start) % 4 < 2 or data[pad:end].strip(b'='):
+            raise _invalid('misplaced padding')
+        if end > len(data):
+            break  # the rest of the group is in the next chunk
+        parts.append(data[start:end])
+        start = end
+    pad = data.find(b'=', start)
+    usable = len(data) if pad < 0 else pad
+    usable -= (usable - start) % 4
+    parts.append(data[start:usable])
+    return parts, data[usable:]
+
+
+def decode(text, encoding='UTF-8', block_size=4 * 65536):
+    """Decodes Base64 back to a string in the given encoding.
+
+    Either alphabet is accepted, with or without padding, and whitespace
+    is ignored. Padding may also end a group in the middle, as where
+    encodings were concatenated; each padded part is decoded in turn.
+
+    Raises:
+      ValueError: if the input isn't Base64 or doesn't decode to text in
+        the encoding.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pieces = []
+    pending = b''
+    try:
+        for pos in range(0, len(text), block_size):
+            parts, pending = _complete(
+                pending + _clean(text[pos:pos + block_size]))
+            for part in parts:
+                pieces.append(decoder.decode(binascii.a2b_base64(part)))
+        if pending:
+            pending += b'=' * (-len(pending) % 4)
+            pieces.append(decoder.decode(binascii.a2b_base64(pending)))
+        pieces.append(decoder.decode(b'', True))
+    except binascii.Error as e:
+        raise _invalid(e)
+    except UnicodeDecodeError as e:
+        raise ValueError('FilterPipes: decoded data is not %s text: %s' %
+                         (encoding, e.reason))
+    return ''.join(pieces)
@@ -0,0 +1,198 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Identifier case conversion.
+
+Converts between CamelCase, mixedCase, snake_case, kebab-case and
+CONSTANT_CASE with the same rules as the example case filters from the
+custom plugin template. ASCII text is converted with translation tables
+and other whole-buffer bytes operations, so no Python code runs per
+character; only lines containing non-ASCII characters fall back to the
+character-by-character rules, which is exact because every conversion
+restarts at each newline.
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import re
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+# The ASCII converters need int.from_bytes (Python 3); SublimeText 2
+# always uses the character-by-character rules.
+_FAST = hasattr(int, 'from_bytes')
+
+try:
+    _is_ascii = str.isascii  # O(1) on Python 3.7+
+except AttributeError:
+    def _is_ascii(text):
+        return not _NON_ASCII.search(text)
+
+_LOWER = b'abcdefghijklmnopqrstuvwxyz'
+_UPPER = b'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_DIGITS = b'0123456789'
+
+
+def _byte_table(mapping, default=None):
+    """Builds a bytes.translate table from (chars, byte) pairs.
+
+    Bytes not mentioned map to default, or to themselves if it's None.
+    """
+    if default is None:
+        table = bytearray(range(256))
+    else:
+        table = bytearray([default]) * 256
+    for chars, value in mapping:
+        for c in bytearray(chars):
+            table[c] = value
+    return bytes(table)
+
+
+# Camel case: map lowercase letters to 0x20 and word boundaries to 0x01,
+# read the result as one big little-endian integer, and shift it by a
+# byte plus five bits so each boundary lines up with the case bit of the
+# following byte. AND-ing the two leaves 0x20 on exactly the letters to
+# capitalize, which one XOR then flips.
+_CAMEL_CLASSES = {
+    # initial caps: a lowercase letter after anything but a letter/digit
+    True: _byte_table([(_LOWER, 0x20), (_UPPER + _DIGITS, 0)], 0x01),
+    # mixed case: a lowercase letter after an underscore
+    False: _byte_table([(_LOWER, 0x20), (b'_', 0x01)], 0),
+}
+
+# Snake case: mark every lowercase letter followed by an uppercase one,
+# interleave the marks with the text, and let a single translate drop
+# the unused marks (bytes >= 0x80 never occur in ASCII text) while
+# converting the letters.
+_SNAKE_CLASSES = _byte_table([(_LOWER, 0x81), (_UPPER, 0x82)], 0x80)
+_SNAKE_DROP = b'\x80\x81\x82'
+_SNAKE_OUTPUT = {
+    'snake': _byte_table([(_UPPER[i:i + 1], _LOWER[i]) for i in range(26)]),
+    'kebab': _byte_table([(_UPPER[i:i + 1], _LOWER[i]) for i in range(26)] +
+                         [(b'_', ord('-'))]),
+    'constant': _byte_table([(_LOWER[i:i + 1], _UPPER[i])
+                             for i in range(26)]),
+}
+
+
+def _camel_ascii(text, initial_caps):
+    data = text.encode('ascii')
+    classes = int.from_bytes(data.translate(_CAMEL_CLASSES[initial_caps]),
+                             'little')
+    # with initial caps, the start of the text is a word boundary too
+    flip = classes & ((classes << 13) | (0x20 if initial_caps else 0))
+    data = (int.from_bytes(data, 'little') ^ flip).to_bytes(
+        len(data), 'little')
+    return data.translate(None, b'_').decode('ascii')
+
+
+def _snake_ascii(text, case):
+    data = text.encode('ascii')
+    marks = data.translate(_SNAKE_CLASSES).replace(b'\x81\x82', b'_\x82')
+    out = bytearray(len(data) * 2)
+    out[0::2] = data
+    out[1::2] = marks
+    return out.translate(_SNAKE_OUTPUT[case], _SNAKE_DROP).decode('ascii')
+
+
+def _camel_chars(text, initial_caps):
+    next_upper = initial_caps
+    out = []
+    for c in text:
+        if c == '_':
+            next_upper = True
+        elif c.islower():
+            if next_upper:
+                out.append(c.upper())
+            else:
+                out.append(c)
+            next_upper = False
+        else:
+            next_upper = initial_caps and not c.isalnum()
+            out.append(c)
+    return ''.join(out)
+
+
+def _snake_chars(text):
+    prev_lower = False
+    out = []
+    for c in text:
+        if c.isupper():
+            if prev_lower:
+                out.append('_')
+            out.append(c.lower())
+            prev_lower = False
+        elif c.islower():
+            prev_lower = True
+            out.append(c)
+        else:
+            prev_lower = False
+            out.append(c)
+    return ''.join(out)
+
+
+# case -> (ASCII converter, general converter)
+_CONVERTERS = {
+    'camel': (lambda t: _camel_ascii(t, True),
+              lambda t: _camel_chars(t, True)),
+    'mixed': (lambda t: _camel_ascii(t, False),
+              lambda t: _camel_chars(t, False)),
+    'snake': (lambda t: _snake_ascii(t, 'snake'), _snake_chars),
+    'kebab': (lambda t: _snake_ascii(t, 'kebab'),
+              lambda t: _snake_chars(t).replace('_', '-')),
+    'constant': (lambda t: _snake_ascii(t, 'constant'),
+                 lambda t: _snake_chars(t).upper()),
+}
+
+CASES = sorted(_CONVERTERS)
+
+
+def convert(text, case):
+    """Converts the identifiers in text to the given case.
+
+    Args:
+      text: string to convert.
+      case: one of "camel", "mixed", "snake", "kebab" or "constant".
+
+    Returns:
+      the converted string.
+    """
+    try:
+        fast, general = _CONVERTERS[case]
+    except KeyError:
+        raise ValueError('unknown case "%s" (expected one of: %s)' %
+                         (case, ', '.join(CASES)))
+    if not _FAST:
+        return general(text)
+    if _is_ascii(text):
+        return fast(text)
+    pieces = []
+    pos = 0
+    match = _NON_ASCII.search(text)
+    while match:
+        begin = max(pos, text.rfind('\n', pos, match.start()) + 1)
+        end = text.find('\n', match.end())
+        if end < 0:
+            end = len(text)
+        if begin > pos:
+            pieces.append(fast(text[pos:begin]))
+        pieces.append(general(text[begin:end]))
+        pos = end
+        match = _NON_ASCII.search(text, pos)
+    pieces.append(fast(text[pos:]))
+    return ''.join(pieces)
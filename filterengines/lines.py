@@ -0,0 +1,298 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Line operations in the style of sort, uniq, tac and cut.
+
+Lines are separated by "\\n" only, and a trailing newline on the input is
+kept on the output. Sorting is stable. Text larger than the RAM budget
+is sorted in runs that are spilled to temporary files and merged back,
+so only one run's worth of line and key objects is alive at a time.
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import heapq
+import itertools
+import locale
+import re
+import tempfile
+
+_NUMBER = re.compile(r'\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+))')
+_DIGITS = re.compile(r'(\d+)')
+_locale_ready = False
+
+
+def numeric_key(line):
+    """Leading number of the line, like sort -n; 0 if there is none."""
+    match = _NUMBER.match(line)
+    return float(match.group(1)) if match else 0.0
+
+
+def natural_key(line):
+    """Orders runs of digits by value: "file2" before "file10"."""
+    parts = _DIGITS.split(line)
+    parts[1::2] = [int(part) for part in parts[1::2]]
+    return parts
+
+
+def locale_key(line):
+    """Collation key for the user's locale (LC_COLLATE)."""
+    global _locale_ready
+    if not _locale_ready:
+        try:
+            locale.setlocale(locale.LC_COLLATE, '')
+        except locale.Error:
+            pass  # keep the C locale
+        _locale_ready = True
+    return locale.strxfrm(line)
+
+
+KEYS = {
+    'text': None,
+    'numeric': numeric_key,
+    'natural': natural_key,
+    'locale': locale_key,
+}
+
+
+def key_function(key='text', ignore_case=False):
+    """Returns the sort key function for a key name (None for plain text).
+
+    Raises:
+      ValueError: for an unknown key name.
+    """
+    try:
+        func = KEYS[key]
+    except KeyError:
+        raise ValueError('unknown sort key "%s" (expected one of: %s)' %
+                         (key, ', '.join(sorted(KEYS))))
+    if not ignore_case:
+        return func
+    if func is None:
+        return lambda line: line.lower()
+    return lambda line: func(line.lower())
+
+
+def _split(text):
+    """Returns (lines, trailing newline or '')."""
+    if text.endswith('\n'):
+        return text[:-1].split('\n'), '\n'
+    return text.split('\n'), ''
+
+
+def _first_of_each(lines, key):
+    """Drops lines whose key equals the previous line's; lazily."""
+    return (next(group) for _, group in itertools.groupby(lines, key))
+
+
+def _join(lines, run_size):
+    """'\n'.join(lines) for an iterator, joined in pieces of about
+    run_size characters so that only one piece's lines are alive at a
+    time (str.join would make a list of them all first)."""
+    pieces = []
+    piece, size = [], 0
+    for line in lines:
+        piece.append(line)
+        size += len(line) + 1
+        if size >= run_size:
+            pieces.append('\n'.join(piece))
+            piece, size = [], 0
+    if piece or not pieces:
+        pieces.append('\n'.join(piece))
+    return '\n'.join(pieces)
+
+
+class _Reversed(object):
+    """Sort key wrapper that inverts the order of the wrapped key."""
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+def _runs(text, end_of_text, size):
+    """Splits text[:end_of_text] into lists of lines totalling about size
+    characters each."""
+    pos = 0
+    while pos <= end_of_text:
+        end = end_of_text
+        if pos + size < end_of_text:
+            end = text.rfind('\n', pos, pos + size)
+            if end <= pos:
+                end = text.find('\n', pos + size)
+                if end < 0:
+                    end = end_of_text
+        yield text[pos:end].split('\n')
+        pos = end + 1
+
+
+def _spill(lines):
+    """Writes lines to an anonymous temporary file, rewound."""
+    spill = tempfile.TemporaryFile()
+    for line in lines:
+        spill.write(line.encode('utf-8') + b'\n')
+    spill.seek(0)
+    return spill
+
+
+def _read_run(spill, index, key, reverse):
+    for raw in spill:
+        line = raw[:-1].decode('utf-8')
+        sort_key = line if key is None else key(line)
+        if reverse:
+            sort_key = _Reversed(sort_key)
+        # the run index keeps equal keys in their original order
+        yield sort_key, index, line
+
+
+def _external_sort(text, end_of_text, key, reverse, run_size):
+    """Yields the sorted lines of text[:end_of_text]."""
+    spills = []
+    try:
+        for run in _runs(text, end_of_text, run_size):
+            run.sort(key=key, reverse=reverse)
+            spills.append(_spill(run))
+            del run[:]
+        merged = heapq.merge(*[_read_run(spill, index, key, reverse)
+                               for index, spill in enumerate(spills)])
+        for _, _, line in merged:
+            yield line
+    finally:
+        for spill in spills:
+            spill.close()
+
+
+def sort_lines(text, key='text', reverse=False, unique=False,
+               ignore_case=False, ram_budget=None):
+    """Sorts the lines of text, like sort(1).
+
+    Args:
+      text: string to sort.
+      key: "text", "numeric" (leading number), "natural" (digit runs by
+        value) or "locale" (the user's collation order).
+      reverse: sort in descending order.
+      unique: keep only the first of lines with equal keys.
+      ignore_case: compare lowercased lines.
+      ram_budget: approximate memory, in bytes, to use for sorting; larger
+        texts are sorted in runs through temporary files.
+
+    Returns:
+      the sorted text.
+    """
+    func = key_function(key, ignore_case)
+    # Line and key objects take several times the size of the text.
+    if ram_budget and len(text) * 4 > ram_budget:
+        newline = '\n' if text.endswith('\n') else ''
+        run_size = max(ram_budget // 4, 1)
+        lines = _external_sort(text, len(text) - len(newline), func,
+                               reverse, run_size)
+        if unique:
+            lines = _first_of_each(lines, func)
+        return _join(lines, run_size) + newline
+    lines, newline = _split(text)
+    lines.sort(key=func, reverse=reverse)
+    if unique:
+        lines = _first_of_each(lines, func)
+    return '\n'.join(lines) + newline
+
+
+def uniq_lines(text, count=False, ignore_case=False):
+    """Collapses runs of identical adjacent lines, like uniq(1).
+
+    With count, each line is prefixed by the length of its run, in the
+    same format as uniq -c.
+    """
+    lines, newline = _split(text)
+    key = key_function('text', ignore_case)
+    groups = itertools.groupby(lines, key)
+    if count:
+        out = []
+        for _, group in groups:
+            first = next(group)
+            out.append('%7d %s' % (1 + sum(1 for _ in group), first))
+    else:
+        out = [next(group) for _, group in groups]
+    return '\n'.join(out) + newline
+
+
+def reverse_lines(text):
+    """Reverses the order of the lines, like tac(1)."""
+    lines, newline = _split(text)
+    lines.reverse()
+    return '\n'.join(lines) + newline
+
+
+def parse_fields(spec):
+    """Parses a cut(1) field list such as "1,3-5,7-" or [1, 3].
+
+    Returns:
+      list of (first, last) 1-based inclusive ranges; last may be None.
+
+    Raises:
+      ValueError: if the list is malformed.
+    """
+    if spec is None or spec == '' or spec == []:
+        raise ValueError('no fields given')
+    if isinstance(spec, int):
+        spec = [spec]
+    if not isinstance(spec, (list, tuple)):
+        spec = str(spec).split(',')
+    ranges = []
+    for item in spec:
+        item = str(item).strip()
+        first, dash, last = item.partition('-')
+        try:
+            first = int(first) if first else 1
+            last = (int(last) if last else None) if dash else first
+        except ValueError:
+            raise ValueError('bad field list entry "%s"' % item)
+        if first < 1 or (last is not None and last < first):
+            raise ValueError('bad field range "%s"' % item)
+        ranges.append((first, last))
+    return ranges
+
+
+def cut_lines(text, fields, delimiter='\t'):
+    """Keeps the given fields of each line, like cut -f.
+
+    Fields are output in their original order, whatever the order of
+    the field list. Lines without the delimiter are kept whole.
+    """
+    ranges = parse_fields(fields)
+    chosen = {}  # field count -> indexes to keep
+
+    def select(parts):
+        indexes = chosen.get(len(parts))
+        if indexes is None:
+            wanted = set()
+            for first, last in ranges:
+                wanted.update(range(first - 1, min(last or len(parts),
+                                                   len(parts))))
+            indexes = chosen[len(parts)] = sorted(wanted)
+        return delimiter.join([parts[i] for i in indexes])
+
+    lines, newline = _split(text)
+    out = [select(line.split(delimiter)) if delimiter in line else line
+           for line in lines]
+    return '\n'.join(out) + newline
@@ -0,0 +1,126 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Replacement of many literal strings in one pass.
+
+The strings are arranged in a trie, with chains of single children
+merged, and the trie is written out as a regex in which every node is
+one alternation over distinct leading characters and every optional
+tail is greedy. The regex engine then walks the trie from each position
+in C, so the cost per character depends on the length of the strings
+rather than how many there are, and the first match found at a position
+is always the longest. Matches are taken leftmost first.
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import codecs
+import json
+import re
+
+_END = ''  # trie key marking the end of a string
+
+
+def _build_trie(keys):
+    root = {}
+    for key in keys:
+        node = root
+        for c in key:
+            node = node.setdefault(c, {})
+        node[_END] = None
+    return root
+
+
+def _trie_pattern(node):
+    """Regex matching the longest string stored below node."""
+    branches = []
+    for c in sorted(k for k in node if k != _END):
+        label = c
+        child = node[c]
+        while len(child) == 1 and _END not in child:
+            (c, child), = child.items()
+            label += c
+        branches.append(re.escape(label) + _trie_pattern(child))
+    if not branches:
+        return ''
+    if len(branches) == 1:
+        pattern = branches[0]
+    else:
+        pattern = '(?:%s)' % '|'.join(branches)
+    if _END in node:
+        pattern = '(?:%s)?' % pattern
+    return pattern
+
+
+class LiteralReplacer(object):
+    """Replaces every occurrence of a set of strings.
+
+    Args:
+      pairs: sequence of (string, replacement) pairs. Empty strings are
+        ignored, and later pairs override earlier ones for the same
+        string.
+    """
+
+    def __init__(self, pairs):
+        self.mapping = dict((key, value) for key, value in pairs if key)
+        if self.mapping:
+            self.regex = re.compile(
+                _trie_pattern(_build_trie(self.mapping)))
+        else:
+            self.regex = None
+
+    def sub(self, text):
+        """Replaces the strings in text, leftmost-longest first."""
+        if self.regex is None:
+            return text
+        mapping = self.mapping
+        return self.regex.sub(lambda match: mapping[match.group()], text)
+
+
+def load_pairs(path):
+    """Reads (string, replacement) pairs from a file.
+
+    Files ending in .json hold an object mapping each string to its
+    replacement, or a list of [string, replacement] pairs. Any other
+    file has one pair per line, separated by a tab.
+
+    Raises:
+      ValueError: if the file isn't in the expected format.
+    """
+    with codecs.open(path, 'r', 'utf-8-sig') as f:
+        text = f.read()
+    if path.lower().endswith('.json'):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return list(data.items())
+        pairs = [tuple(pair) for pair in data]
+        for index, pair in enumerate(pairs):
+            if len(pair) != 2:
+                raise ValueError('%s, entry %d: expected [string, '
+                                 'replacement]' % (path, index + 1))
+        return pairs
+    pairs = []
+    for number, line in enumerate(text.split('\n'), 1):
+        line = line.rstrip('\r')
+        if not line:
+            continue
+        if '\t' not in line:
+            raise ValueError('%s, line %d: expected string<TAB>replacement'
+                             % (path, number))
+        pairs.append(tuple(line.split('\t', 1)))
+    return pairs
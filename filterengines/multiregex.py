@@ -0,0 +1,289 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Ordered regex substitution rules, fused into as few passes as possible.
+
+A rule set behaves exactly like applying each rule's re.sub in turn.
+Runs of consecutive rules that provably can't interact are compiled
+into one alternation and applied in a single scan, with the first
+character of each match (or, for plain strings, the whole match)
+selecting the rule whose replacement to use. Two rules can share a pass
+when:
+
+  * their matches can never overlap: each matches only a known, finite
+    set of characters and neither can start with a character the other
+    matches, or both are plain strings and neither contains the other or
+    starts with an end of it;
+  * neither uses anchors, lookaround or backreferences, and neither can
+    match the empty string, so a match never depends on its neighbors;
+  * the earlier rule's replacement is non-empty literal text containing
+    none of the later rule's characters, so the later rule can't match
+    anything the earlier one produced.
+
+Everything else (and anything the analysis can't prove) runs as its own
+sequential pass.
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import re
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+try:
+    unichr
+except NameError:  # Python 3
+    unichr = chr
+
+_MAX_RANGE = 256  # larger character class ranges count as unbounded
+
+# Characters other than the two ASCII cases that re.IGNORECASE matches.
+_IGNORECASE_EXTRA = {'i': u'\u0130\u0131', 'k': u'\u212a', 's': u'\u017f'}
+
+_EMPTY = re.compile('')
+
+# Group-free patterns matching different text: a replacement template
+# expands the same against both only if it doesn't refer to the match.
+_PROBES = (re.compile('a'), re.compile('b'))
+
+
+def _add_alphabet(items, chars):
+    """Adds the characters a parsed pattern can match to chars.
+
+    Returns:
+      False if the pattern could match an open-ended set of characters
+      or uses constructs whose matches depend on the surrounding text.
+    """
+    for op, av in items:
+        op = str(op).upper()
+        if op == 'LITERAL':
+            chars.add(unichr(av))
+        elif op == 'IN':
+            for item_op, item in av:
+                item_op = str(item_op).upper()
+                if item_op == 'LITERAL':
+                    chars.add(unichr(item))
+                elif item_op == 'RANGE' and item[1] - item[0] < _MAX_RANGE:
+                    chars.update(unichr(c) for c in range(item[0],
+                                                          item[1] + 1))
+                else:  # negated sets, \d, \w and other categories
+                    return False
+        elif op == 'BRANCH':
+            for branch in av[1]:
+                if not _add_alphabet(branch, chars):
+                    return False
+        elif op == 'SUBPATTERN':
+            if len(av) == 4 and (av[1] or av[2]):
+                return False  # scoped flags like (?i:...)
+            if not _add_alphabet(av[-1], chars):
+                return False
+        elif op in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            if not _add_alphabet(av[2], chars):
+                return False
+        elif op == 'ATOMIC_GROUP':
+            if not _add_alphabet(av, chars):
+                return False
+        else:  # ANY, AT, ASSERT, GROUPREF, NOT_LITERAL, ...
+            return False
+    return True
+
+
+def _add_first(items, chars):
+    """Adds the characters a match can start with to chars.
+
+    Only valid for patterns _add_alphabet accepted.
+
+    Returns:
+      True if the items can all match the empty string, in which case
+      whatever follows them can supply the first character too.
+    """
+    for op, av in items:
+        name = str(op).upper()
+        if name in ('LITERAL', 'IN'):
+            _add_alphabet([(op, av)], chars)
+            return False
+        elif name == 'BRANCH':
+            empty = False
+            for branch in av[1]:
+                empty = _add_first(branch, chars) or empty
+            if not empty:
+                return False
+        elif name == 'SUBPATTERN':
+            if not _add_first(av[-1], chars):
+                return False
+        elif name == 'ATOMIC_GROUP':
+            if not _add_first(av, chars):
+                return False
+        else:  # repeats
+            if not _add_first(av[2], chars) and av[0] > 0:
+                return False
+    return True
+
+
+def _fold_case(chars):
+    """Adds the characters re.IGNORECASE matches, or None if unknown."""
+    for c in list(chars):
+        if ord(c) > 127:
+            return None
+        chars.update((c.lower(), c.upper()))
+        chars.update(_IGNORECASE_EXTRA.get(c.lower(), ''))
+    return chars
+
+
+def _strings_overlap(a, b):
+    """True if occurrences of the strings a and b can overlap."""
+    if a in b or b in a:
+        return True
+    for size in range(1, min(len(a), len(b))):
+        if a.endswith(b[:size]) or b.endswith(a[:size]):
+            return True
+    return False
+
+
+class Rule(object):
+    """One (pattern, replacement, flags) substitution."""
+
+    def __init__(self, pattern, replacement, flags=0):
+        self.pattern = pattern
+        self.replacement = replacement
+        self.flags = int(flags)
+        self.compiled = re.compile(pattern, self.flags)
+        self.literal = None  # the matched text, for plain-string patterns
+        self.first = None  # characters a match can start with
+        self.alphabet = self._alphabet()
+        # literal replacement text, or None if it refers to the match
+        try:
+            expansions = set(probe.sub(replacement, probe.pattern)
+                             for probe in _PROBES)
+        except re.error:
+            expansions = ()
+        self.expanded = expansions.pop() if len(expansions) == 1 else None
+
+    def _alphabet(self):
+        """Set of characters this rule can match, or None if unknown."""
+        if self.compiled.groupindex or self.flags & re.LOCALE:
+            return None
+        if re.compile(self.pattern).flags != _EMPTY.flags:
+            return None  # inline flags like (?i) can't be fused
+        parsed = sre_parse.parse(self.pattern, self.flags)
+        if parsed.getwidth()[0] == 0:
+            return None  # can match the empty string
+        chars = set()
+        if not _add_alphabet(parsed, chars):
+            return None
+        first = set()
+        _add_first(parsed, first)
+        if self.flags & re.IGNORECASE:
+            chars = _fold_case(chars)
+            first = _fold_case(first)
+            if chars is None or first is None:
+                return None
+        elif all(str(op).upper() == 'LITERAL' for op, _ in parsed):
+            self.literal = u''.join(unichr(c) for _, c in parsed)
+        self.first = first
+        return chars
+
+    def output(self):
+        """Characters of the replacement text, or None if not fixed."""
+        if not self.expanded:
+            return None
+        return set(self.expanded)
+
+    def expand(self, match):
+        """Replacement for a match of this rule made by a fused pattern."""
+        return self.compiled.match(match.string, match.start()).expand(
+            self.replacement)
+
+
+class RuleSet(object):
+    """A compiled, ordered list of substitution rules.
+
+    Args:
+      rules: sequence of (pattern, replacement) or
+        (pattern, replacement, flags) entries.
+      fuse: combine compatible rules into shared passes. Each match in a
+        shared pass costs a Python call, so this pays off when the rules
+        match rarely compared to the length of the text.
+    """
+
+    def __init__(self, rules, fuse=True):
+        self.rules = [Rule(*rule) for rule in rules]
+        self.passes = []  # (compiled pattern, replacement) per scan
+        batch = []
+        for rule in self.rules:
+            if batch and not (fuse and self._joins(batch, rule)):
+                self._add_pass(batch)
+                batch = []
+            batch.append(rule)
+        if batch:
+            self._add_pass(batch)
+
+    @staticmethod
+    def _joins(batch, rule):
+        if rule.alphabet is None or batch[0].alphabet is None:
+            return False
+        if rule.flags != batch[0].flags:
+            return False
+        for earlier in batch:
+            output = earlier.output()
+            if output is None or output & rule.alphabet:
+                return False
+            # Overlapping matches would have to start inside one another.
+            if (earlier.first & rule.alphabet or
+                    rule.first & earlier.alphabet):
+                if (earlier.literal is None or rule.literal is None or
+                        _strings_overlap(earlier.literal, rule.literal)):
+                    return False
+        return True
+
+    def _add_pass(self, batch):
+        if len(batch) == 1:
+            rule = batch[0]
+            self.passes.append((rule.compiled, rule.replacement))
+            return
+        flags = batch[0].flags
+        end = '\n)' if flags & re.VERBOSE else ')'
+        fused = re.compile('|'.join(
+            '(?:%s%s' % (rule.pattern, end) for rule in batch), flags)
+        # Rules in a pass never share a first character unless they are
+        # plain strings, which the matched text itself tells apart.
+        by_first = {}
+        by_text = {}
+        for rule in batch:
+            for c in rule.first:
+                by_first.setdefault(c, []).append(rule)
+            if rule.literal is not None:
+                by_text[rule.literal] = rule
+
+        def replace(match):
+            text = match.group()
+            rules = by_first[text[0]]
+            rule = rules[0] if len(rules) == 1 else by_text[text]
+            if rule.expanded is not None:
+                return rule.expanded
+            return rule.expand(match)
+        self.passes.append((fused, replace))
+
+    def sub(self, text):
+        """Applies every rule, in order, to text."""
+        for pattern, replacement in self.passes:
+            text = pattern.sub(replacement, text)
+        return text
@@ -0,0 +1,177 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Bulk conversion of integers between bases.
+
+Rather than calling back into Python for every regex match, the text is
+split into alternating text and number tokens in one pass, the numbers
+are converted together with map() over builtins (each distinct number
+only once, which is what makes hex dumps and tables cheap), and the
+pieces are joined back up in one go. Conversion can be restricted to
+columns of delimited text, each found with one anchored multi-line
+regex.
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import re
+import sys
+from itertools import repeat
+try:
+    from itertools import imap  # Python 2's map stops at the longest input
+except ImportError:
+    imap = map
+
+PATTERNS = {
+    2: r"\b((?:0[Bb])?[01]+)\b",
+    8: r"\b([0-7]+)\b",
+    10: r"\b([0-9]+)\b",
+    16: r"\b((?:0[Xx])?[0-9a-fA-F]+)\b",
+}
+BASES = sorted(PATTERNS)
+_CODES = {2: 'b', 8: 'o', 10: 'd', 16: 'x'}
+PREFIX = {2: '0b', 8: '0', 10: '', 16: '0x'}
+
+_SAMPLE = 1024  # tokens looked at to decide whether to convert uniques
+_compiled = {}
+
+
+def _pattern(base):
+    pattern = _compiled.get(base)
+    if pattern is None:
+        if base not in PATTERNS:
+            raise ValueError('unsupported base %s (expected one of: %s)' %
+                             (base, ', '.join(str(b) for b in BASES)))
+        pattern = _compiled[base] = re.compile(PATTERNS[base])
+    return pattern
+
+
+def formatter(base, width=0, upper=False, prefix=True):
+    """Returns a function formatting an int in base.
+
+    Args:
+      base: output base, one of BASES.
+      width: minimum number of digits, zero-padded; the prefix is extra.
+      upper: upper-case hex digits and prefix.
+      prefix: start with 0b, 0 or 0x as appropriate.
+    """
+    if base not in _CODES:
+        raise ValueError('unsupported base %s (expected one of: %s)' %
+                         (base, ', '.join(str(b) for b in BASES)))
+    width = int(width or 0)
+    code = _CODES[base]
+    lead = PREFIX[base] if prefix else ''
+    if upper and base == 16:
+        code, lead = code.upper(), lead.upper()
+    # builtins are several times quicker than format() where they fit
+    # (but Python 2's hex() marks longs with an "L")
+    if not width and not upper:
+        if base == 10:
+            return str
+        if prefix and base == 2:
+            return bin
+        if prefix and base == 16 and sys.version_info[0] == 3:
+            return hex
+    if not width and base != 2:
+        return (lead + '%' + code).__mod__
+    spec = ('0%d' % width if width else '') + code
+    return (lead + '{0:' + spec + '}').format
+
+
+def _convert_tokens(tokens, base, fmt):
+    """Converts a list of number strings, each unique one only once."""
+    if not tokens:
+        return []
+    if len(set(tokens[:_SAMPLE])) * 2 <= min(len(tokens), _SAMPLE):
+        unique = list(set(tokens))
+        table = dict(zip(unique, _convert_tokens(unique, base, fmt)))
+        return list(map(table.__getitem__, tokens))
+    try:
+        return list(imap(fmt, imap(int, tokens, repeat(base))))
+    except ValueError:  # keep anything int() won't take as it was
+        return [_convert_one(token, base, fmt) for token in tokens]
+
+
+def _convert_one(token, base, fmt):
+    try:
+        return fmt(int(token, base))
+    except ValueError:
+        return token
+
+
+def _column_pattern(column, delimiter):
+    """Regex whose second group is the column'th (1-based) field of a line.
+
+    With no delimiter, fields are separated by runs of spaces and tabs
+    and leading blanks are skipped, as with awk.
+    """
+    if delimiter is None:
+        field, sep, lead = r'[^\s]+', r'[^\S\n]+', r'[^\S\n]*'
+    else:
+        sep = re.escape(delimiter)
+        if len(delimiter) == 1:
+            field = r'[^%s\n]*' % sep
+        else:
+            field = r'(?:(?!%s)[^\n])*' % sep
+        lead = ''
+    return re.compile(r'^(%s(?:%s%s){%d})(%s)' % (
+        lead, field, sep, column - 1, field), re.M)
+
+
+def convert(text, from_base=10, to_base=16, width=0, upper=False,
+            prefix=True, columns=None, delimiter=None):
+    """Converts the integers in text from one base to another.
+
+    Args:
+      text: string to convert.
+      from_base, to_base: bases, each one of BASES.
+      width, upper, prefix: output format; see formatter().
+      columns: 1-based field numbers to restrict conversion to, or None
+        for the whole text.
+      delimiter: string separating fields, or None for runs of blanks.
+        No quoting is recognized.
+
+    Returns:
+      the converted string.
+    """
+    from_base, to_base = int(from_base), int(to_base)
+    pattern = _pattern(from_base)
+    fmt = formatter(to_base, width, upper, prefix)
+
+    def convert_all(text):
+        parts = pattern.split(text)
+        parts[1::2] = _convert_tokens(parts[1::2], from_base, fmt)
+        return ''.join(parts)
+
+    if not columns:
+        return convert_all(text)
+    for column in sorted(set(int(c) for c in columns)):
+        if column < 1:
+            raise ValueError('column numbers start at 1, not %d' % column)
+        # [before, leading fields, field, between, leading fields, ...]
+        parts = _column_pattern(column, delimiter).split(text)
+        fields = parts[2::3]
+        if not fields:
+            continue
+        if '\0' in text:
+            fields = [convert_all(field) for field in fields]
+        else:  # one pass over all the fields; NUL is a word boundary
+            fields = convert_all('\0'.join(fields)).split('\0')
+        parts[2::3] = fields
+        text = ''.join(parts)
+    return text
@@ -30,11 +30,29 @@ __version__ = '1.1.0'
 __license__ = 'Apache 2'
 __copyright__ = 'Copyright 2015, Google Inc.'
 
+import codecs
+import copy
+import errno
+import hashlib
+import os
+import shlex
+import shutil
+import signal
 import subprocess
 import sublime
 import sublime_plugin
 import sys
 import re
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
 
 ###############################################################
 # Python/Sublime version compatibility
@@ -44,11 +62,363 @@ if sys.version_info[0] == 2:   # Python 2.x specific (ST2)
         return isinstance(obj, basestring)
 else:  # Python 3.x
     PYTHON2=False
+    unichr = chr
     def is_str(obj):  # Python 3.x specific (ST3)
         return isinstance(obj, str)
 ###############################################################
 
 
+class LazyModule(object):
+    """Stand-in for a module that is only imported when first used.
+
+    Plugins are all loaded when SublimeText starts, so modules needed by
+    just a few commands can be bound with this instead, e.g.
+        difflib = LazyModule('difflib')
+    and the import then happens on the first attribute lookup.
+    """
+
+    def __init__(self, name):
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def __getattr__(self, attr):
+        # only reached for attributes not found on the stand-in itself
+        if self._lazy_module is None:
+            __import__(self._lazy_name)
+            self._lazy_module = sys.modules[self._lazy_name]
+        return getattr(self._lazy_module, attr)
+
+    def __repr__(self):
+        return '<lazy module %r>' % self._lazy_name
+
+
+difflib = LazyModule('difflib')
+multiprocessing = LazyModule('multiprocessing')
+
+
+class LRUCache(object):
+    """Bounded mapping that discards the least recently used entries.
+
+    Bounded by entry count and, if sizeof is given, by the total size of
+    the values as measured by that function.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value  # move to the most-recent end
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._data[key] = value
+            self.size += size
+            while (len(self._data) > self.max_entries or
+                   (self.max_bytes and self.size > self.max_bytes)):
+                self._discard(next(iter(self._data)))
+
+    def _discard(self, key):
+        if key in self._data:
+            value = self._data.pop(key)
+            if self.max_bytes:
+                self.size -= self.sizeof(value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+_pattern_cache = LRUCache(128)
+
+
+def compile_pattern(pattern, flags=0):
+    """Compiles a regex, reusing any earlier compilation of it.
+
+    Args:
+      pattern: regex string, or an already-compiled pattern object.
+      flags: re module flags to compile with.
+
+    Returns:
+      compiled pattern object.
+    """
+    if not is_str(pattern):
+        return pattern
+    key = (pattern, flags)
+    compiled = _pattern_cache.get(key)
+    if compiled is None:
+        compiled = re.compile(pattern, flags)
+        _pattern_cache.put(key, compiled)
+    return compiled
+
+
+def _nested_repeat(items, inside=False):
+    for op, av in items:
+        op = str(op).upper()
+        if op in ('MAX_REPEAT', 'MIN_REPEAT'):
+            unbounded = av[1] == sre_parse.MAXREPEAT
+            if unbounded and inside:
+                return True
+            if _nested_repeat(av[2], inside or unbounded):
+                return True
+        elif op == 'BRANCH':
+            for branch in av[1]:
+                if _nested_repeat(branch, inside):
+                    return True
+        elif op == 'SUBPATTERN':
+            if _nested_repeat(av[-1], inside):
+                return True
+        elif op in ('ASSERT', 'ASSERT_NOT'):
+            if _nested_repeat(av[1], inside):
+                return True
+    return False
+
+
+def risky_pattern(pattern, flags=0):
+    r"""Checks a regex for nested unbounded repeats, like (a+)+ or (\w*,?)*.
+
+    Those can backtrack for an exponentially long time on text that
+    almost matches. Atomic groups and possessive repeats don't backtrack
+    and aren't reported.
+
+    Args:
+      pattern: regex string, or an already-compiled pattern object.
+      flags: re module flags it is compiled with.
+    """
+    if not is_str(pattern):
+        pattern, flags = pattern.pattern, pattern.flags
+    try:
+        return _nested_repeat(sre_parse.parse(pattern, flags))
+    except (re.error, TypeError):
+        return False
+
+
+_result_cache = LRUCache(4096, max_bytes=32 * 1024 * 1024,
+                         sizeof=sys.getsizeof)
+# settings that change how a result is reported or applied, not what it is
+_PRESENTATION_SETTINGS = frozenset([
+    'errors_on_statusbar', 'report_success', 'report_failure',
+    'report_nochange', 'minimal_diff', 'show_metrics', 'metrics_log',
+    'metrics_log_max_bytes'])
+_disk_cache_writes = 0
+
+
+def _disk_cache_dir():
+    if not hasattr(sublime, 'cache_path'):  # ST2 has no cache directory
+        return None
+    return os.path.join(sublime.cache_path(), 'FilterPipes')
+
+
+def _disk_cache_get(digest):
+    cache_dir = _disk_cache_dir()
+    if cache_dir is None:
+        return None
+    try:
+        with open(os.path.join(cache_dir, digest[:2], digest), 'rb') as f:
+            return f.read().decode('UTF-8')
+    except (IOError, OSError):
+        return None
+
+
+def _disk_cache_put(digest, text, max_bytes):
+    global _disk_cache_writes
+    cache_dir = _disk_cache_dir()
+    if cache_dir is None:
+        return
+    subdir = os.path.join(cache_dir, digest[:2])
+    try:
+        if not os.path.isdir(subdir):
+            os.makedirs(subdir)
+        tmp = os.path.join(subdir, '%s.%d.tmp' % (digest, os.getpid()))
+        with open(tmp, 'wb') as f:
+            f.write(text.encode('UTF-8'))
+        os.rename(tmp, os.path.join(subdir, digest))
+    except (IOError, OSError):
+        return  # the cache is best-effort
+    _disk_cache_writes += 1
+    if _disk_cache_writes % 64 == 0:
+        _prune_disk_cache(cache_dir, max_bytes)
+
+
+def _prune_disk_cache(cache_dir, max_bytes):
+    """Deletes the oldest cached results until under max_bytes."""
+    entries = []
+    for dirpath, _, filenames in os.walk(cache_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(e[1] for e in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+_clock = getattr(time, 'perf_counter', time.time)
+_metrics_hooks = []
+
+
+def add_metrics_hook(hook):
+    """Registers hook(record) to be called with the metrics of every run.
+
+    The record is a dict holding the command name, wall-clock start time,
+    total and per-phase durations in seconds, and counters.
+    """
+    _metrics_hooks.append(hook)
+
+
+def remove_metrics_hook(hook):
+    _metrics_hooks.remove(hook)
+
+
+class RunMetrics(object):
+    """Per-phase timings and counters collected during one command run."""
+
+    def __init__(self, command):
+        self.command = command
+        self.started = time.time()
+        self.deferred = False  # set while an async run is still going
+        self.phases = OrderedDict()
+        self.counters = OrderedDict()
+        self._start = _clock()
+
+    def add(self, phase, since):
+        """Adds the time elapsed since the _clock() reading to phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + _clock() - since
+
+    def count(self, counter, amount=1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def as_dict(self):
+        record = OrderedDict()
+        record['command'] = self.command
+        record['time'] = self.started
+        record['total'] = _clock() - self._start
+        record['phases'] = self.phases
+        record.update(self.counters)
+        return record
+
+    def summary(self):
+        return '[%s]' % ', '.join(
+            '%s %.1fms' % (phase, seconds * 1e3)
+            for phase, seconds in self.phases.items())
+
+
+class _NullMetrics(RunMetrics):
+    """Stands in when a filter is used outside of run()."""
+
+    def __init__(self):
+        RunMetrics.__init__(self, None)
+
+    def add(self, phase, since):
+        pass
+
+    def count(self, counter, amount=1):
+        pass
+
+
+def _append_metrics_log(path, record, max_bytes):
+    """Appends a JSON line to path, rotating it to path.1 when full."""
+    try:
+        if os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+            if os.path.exists(path + '.1'):
+                os.remove(path + '.1')
+            os.rename(path, path + '.1')
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    except (IOError, OSError) as e:
+        print('FilterPipes: cannot write metrics log %s: %s' % (path, e))
+
+
+def split_lines(text, size):
+    """Splits text into pieces of roughly size characters at line ends."""
+    chunks = []
+    start = 0
+    while start < len(text):
+        newline = text.find('\n', start + size)
+        if newline < 0:
+            chunks.append(text[start:])
+            break
+        chunks.append(text[start:newline + 1])
+        start = newline + 1
+    return chunks
+
+
+def _fork_context():
+    """multiprocessing context that forks, or None where unsupported."""
+    if os.name != 'posix' or not hasattr(multiprocessing, 'get_context'):
+        return None
+    try:
+        return multiprocessing.get_context('fork')
+    except ValueError:
+        return None
+
+
+def _filter_chunk(job):
+    """Pool worker: runs one chunk through a fresh filter instance."""
+    cls, settings, chunk = job
+    command = cls(None)
+    command.apply_settings(settings)
+    command.post_init()
+    return command.filter(chunk)
+
+
+def diff_hunks(old, new):
+    """Finds the line-level differences between two strings.
+
+    Returns:
+      list of (start, end, text) tuples in ascending order, each saying
+      that old[start:end] should be replaced by text.
+    """
+    a = old.splitlines(True)
+    b = new.splitlines(True)
+    # trim the common ends first; the matcher is slow on long inputs
+    shortest = min(len(a), len(b))
+    head = 0
+    while head < shortest and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < shortest - head and a[-1 - tail] == b[-1 - tail]:
+        tail += 1
+    offsets = [0]
+    for line in a:
+        offsets.append(offsets[-1] + len(line))
+    matcher = difflib.SequenceMatcher(
+        None, a[head:len(a) - tail], b[head:len(b) - tail])
+    hunks = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            hunks.append((offsets[head + i1], offsets[head + i2],
+                          ''.join(b[head + j1:head + j2])))
+    return hunks
+
+
 class FilterPipesCommandBase(sublime_plugin.TextCommand):
     """Generic base for function-based filter commands.
 
@@ -57,12 +427,46 @@ class FilterPipesCommandBase(sublime_plugin.TextCommand):
     text replacement logic are handled by this class.
 
     Override filter(self, data) to perform text filter operation.
+
+    Set "cacheable" on filters whose output depends only on their settings
+    and input: results are then memoized in memory (and on disk as well
+    with "cache_disk"), and identical selections are filtered only once.
+    Filters that also depend on other state, such as a file they read,
+    return it from cache_state() so that it becomes part of the key.
+
+    Set "minimal_diff" to replace only the lines that the filter changed
+    rather than the whole region, which keeps undo history small and
+    leaves markers, folds and scroll position alone elsewhere.
+
+    Set "parallel" on filters that declare line_local (each line is
+    filtered independently of the others) to split selections larger than
+    parallel_min_size at line boundaries and filter the pieces in a pool
+    of worker processes. Forking is required, so this is POSIX only.
+
+    Every run records per-phase timings in self.metrics. Set
+    "show_metrics" to add them to the status message, "metrics_log" to
+    append them to a JSON-lines file, or see add_metrics_hook().
     """
     use_selections = True
     errors_on_statusbar = True
     report_success = True
     report_failure = True
     report_nochange = True
+    minimal_diff = False
+    cacheable = False
+    cache_disk = False
+    cache_disk_max_bytes = 256 * 1024 * 1024
+    line_local = False  # set by filters whose lines don't affect each other
+    parallel = False
+    parallel_min_size = 1024 * 1024
+    parallel_chunk_size = 256 * 1024
+    parallel_workers = None  # default: number of CPUs
+    show_metrics = False
+    metrics_log = None
+    metrics_log_max_bytes = 1024 * 1024
+    metrics = _NullMetrics()
+    _applied_settings = ()
+    _run_memo = None
 
     def filter(self, data):
         """Perform transformation on document text.
@@ -92,29 +496,44 @@ class FilterPipesCommandBase(sublime_plugin.TextCommand):
     def do_replacements(self, edit):
         self.success = False
         self.replaced = False
-        replacements = []
-        for r in self._regions():
-            replacement = self._get_replacement(r)
-            if replacement is None:
-                continue
-            if replacement:
-                replacements.append(replacement)
+        replacements = self._get_replacements(self._regions())
         # replace in reverse order to avoid overlap complications
+        start = _clock()
         for replacement in reversed(replacements):
             self._commit_replacement(edit, replacement)
-        msg = None
+        self.metrics.add('commit', start)
+        self._status_message(self._result_message())
+
+    def _result_message(self):
         if not self.success:
             if self.report_failure:
-                msg = self.failure_message()
+                return self.failure_message()
         elif not self.replaced:
             if self.report_nochange:
-                msg = self.nochange_message()
+                return self.nochange_message()
         else:
             if self.report_success:
-                msg = self.success_message()
+                return self.success_message()
+        return None
+
+    def _status_message(self, msg):
+        """Shows msg in the status bar, with timings if configured."""
+        if msg and self.show_metrics:
+            msg = '%s %s' % (msg, self.metrics.summary())
         if msg:
             sublime.status_message(msg)
 
+    def _emit_metrics(self):
+        record = self.metrics.as_dict()
+        if self.metrics_log:
+            _append_metrics_log(os.path.expanduser(self.metrics_log), record,
+                                int(self.metrics_log_max_bytes))
+        for hook in list(_metrics_hooks):
+            try:
+                hook(record)
+            except Exception:
+                traceback.print_exc()
+
     def post_init(self):
         """Hook for doing some post-init reconfiguration.
 
@@ -124,10 +543,16 @@ class FilterPipesCommandBase(sublime_plugin.TextCommand):
         pass
 
     def apply_settings(self, settings):
+        # Sublime reuses one command instance per view, so forget whatever
+        # the previous run set before applying this run's arguments.
+        for k in self._applied_settings:
+            self.__dict__.pop(k, None)
+        self._applied_settings = tuple(settings)
         for k, v in settings.items():
             setattr(self, k, v)
 
     def run(self, edit, **settings):
+        self.metrics = RunMetrics(command_name(type(self)))
         try:
             self.apply_settings(settings)
             self.post_init()
@@ -136,18 +561,123 @@ class FilterPipesCommandBase(sublime_plugin.TextCommand):
             if self.errors_on_statusbar:
                 sublime.status_message(str(ex))
             raise
+        if not self.metrics.deferred:
+            self._emit_metrics()
 
-    def _get_replacement(self, region):
-        existing = self.view.substr(region)
-        filtered = self.filter(existing)
+    def _get_replacements(self, regions, texts=None):
+        if texts is None:
+            texts = [None] * len(regions)
+        self._run_memo = {}
+        replacements = []
+        for region, existing in zip(regions, texts):
+            replacement = self._get_replacement(region, existing)
+            if replacement:
+                replacements.extend(
+                    self._split_replacement(replacement, existing))
+        return replacements
+
+    def _get_replacement(self, region, existing=None):
+        if existing is None:
+            start = _clock()
+            existing = self.view.substr(region)
+            self.metrics.add('read', start)
+        start = _clock()
+        if self.cacheable:
+            filtered = self._filter_cached(existing)
+        else:
+            filtered = self._filter_maybe_parallel(existing)
+        self.metrics.add('filter', start)
+        return self._make_replacement(region, existing, filtered)
+
+    def _filter_cached(self, data):
+        """Runs filter() through the run memo and the result caches."""
+        memo = self._run_memo if self._run_memo is not None else {}
+        if data in memo:
+            return memo[data]
+        digest = self._cache_digest(data)
+        filtered = _result_cache.get(digest)
+        if filtered is None and self.cache_disk:
+            filtered = _disk_cache_get(digest)
+            if filtered is not None:
+                _result_cache.put(digest, filtered)
         if filtered is None:
+            filtered = self._filter_maybe_parallel(data)
+            if filtered is not None:
+                _result_cache.put(digest, filtered)
+                if self.cache_disk:
+                    _disk_cache_put(digest, filtered,
+                                    int(self.cache_disk_max_bytes))
+        memo[data] = filtered
+        return filtered
+
+    def _filter_maybe_parallel(self, data):
+        if (not self.parallel or not self.line_local or
+                len(data) < int(self.parallel_min_size)):
+            return self.filter(data)
+        chunks = split_lines(data, int(self.parallel_chunk_size))
+        context = _fork_context()
+        if context is None:
+            return self.filter(data)
+        workers = min(len(chunks),
+                      int(self.parallel_workers or multiprocessing.cpu_count()))
+        if workers < 2:
+            return self.filter(data)
+        settings = dict((k, getattr(self, k)) for k in self._applied_settings)
+        pool = context.Pool(workers)
+        try:
+            results = pool.map(
+                _filter_chunk, [(type(self), settings, c) for c in chunks], 1)
+        finally:
+            pool.terminate()
+        self.metrics.count('parallel_chunks', len(chunks))
+        if None in results:
             return None
+        return ''.join(results)
+
+    def cache_state(self):
+        """State other than settings and input that the output depends on.
+
+        Returns:
+          a tuple whose repr() is included in the result cache key.
+        """
+        return ()
+
+    def _cache_digest(self, data):
+        """Hash of the command class, its settings for this run, any
+        cache_state(), and data."""
+        cls = type(self)
+        settings = sorted((k, getattr(self, k)) for k in self._applied_settings
+                          if k not in _PRESENTATION_SETTINGS)
+        h = hashlib.sha1()
+        h.update(('%s.%s\0%r\0%r\0' % (cls.__module__, cls.__name__,
+                                         settings, self.cache_state())
+                  ).encode('UTF-8'))
+        h.update(data.encode('UTF-8'))
+        return h.hexdigest()
+
+    def _make_replacement(self, region, existing, filtered):
+        self.metrics.count('regions')
+        self.metrics.count('chars_in', len(existing))
+        if filtered is None:
+            return None
+        self.metrics.count('chars_out', len(filtered))
         self.success = True
         if filtered == existing:
             return None
         self.replaced = True
         return (region, filtered)
 
+    def _split_replacement(self, replacement, existing=None):
+        """Narrows a replacement down to the lines that actually changed."""
+        if not self.minimal_diff:
+            return [replacement]
+        region, text = replacement
+        if existing is None:
+            existing = self.view.substr(region)
+        begin = region.begin()
+        return [(sublime.Region(begin + start, begin + end), new)
+                for start, end, new in diff_hunks(existing, text)]
+
     def _commit_replacement(self, edit, replacement):
         region, text = replacement
         self.view.replace(edit, region, text)
@@ -161,47 +691,907 @@ class FilterPipesCommandBase(sublime_plugin.TextCommand):
         return regions
 
 
+_running_jobs = {}  # view id -> _ProcessJob, for asynchronous runs
+
+
+def _kill_process(proc):
+    """Kills a process along with its process group, where possible."""
+    try:
+        if os.name == 'posix' and os.getpgid(proc.pid) == proc.pid:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:
+        pass  # already gone
+
+
+class _ProcessJob(object):
+    """Processes started by one filter run, so they can be killed."""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = time.time()
+        self.stop_reason = None
+        self._procs = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def attach(self, proc):
+        with self._lock:
+            self._procs.append(proc)
+            stopped = self.stop_reason is not None
+        if stopped:
+            _kill_process(proc)
+
+    def detach(self, proc):
+        with self._lock:
+            self._procs.remove(proc)
+
+    def stop(self, reason):
+        with self._lock:
+            if self.stop_reason is None:
+                self.stop_reason = reason
+            procs = list(self._procs)
+        for proc in procs:
+            _kill_process(proc)
+
+    def start_timeout(self, seconds):
+        self._timer = threading.Timer(
+            seconds, self.stop, ['timed out after %gs' % seconds])
+        self._timer.daemon = True
+        self._timer.start()
+
+    def finish(self):
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def show_progress(self, view):
+        if _running_jobs.get(view.id()) is not self:
+            view.erase_status('filterpipes')
+            return
+        view.set_status('filterpipes', 'FilterPipes: running [%s] %ds' %
+                        (self.label, time.time() - self.started))
+        sublime.set_timeout(lambda: self.show_progress(view), 500)
+
+
+_servers = {}  # pool key -> _CoProcess
+_servers_lock = threading.Lock()
+
+
+class _CoProcess(object):
+    """A pooled, long-running command speaking the server protocol."""
+
+    def __init__(self, key, command, popen_args):
+        self.key = key
+        self.command = command
+        self.popen_args = popen_args
+        self.last_used = time.time()
+        self._proc = None
+        self._stderr = bytearray()
+        self._reaper = None
+        self._lock = threading.Lock()
+
+    def request(self, data, job=None, idle_timeout=None):
+        """Sends one request, restarting the server once if it died.
+
+        Returns:
+          (status, payload bytes) as sent back by the server.
+        """
+        with self._lock:
+            if self._reaper is not None:
+                self._reaper.cancel()
+            try:
+                try:
+                    return self._roundtrip(data, job)
+                except (IOError, OSError, ValueError):
+                    self._stop()
+                    if job is not None and job.stop_reason:
+                        raise OSError(errno.EINTR, job.stop_reason)
+                    return self._roundtrip(data, job)
+            except (IOError, ValueError) as e:
+                self._stop()
+                raise OSError(errno.EPIPE, '%s\n%s' % (
+                    e, self._stderr.decode('UTF-8', 'replace')))
+            finally:
+                self.last_used = time.time()
+                if idle_timeout:
+                    self._reaper = threading.Timer(idle_timeout, self._reap)
+                    self._reaper.daemon = True
+                    self._reaper.start()
+
+    def _roundtrip(self, data, job):
+        if self._proc is None or self._proc.poll() is not None:
+            self._start()
+        proc = self._proc
+        if job is not None:
+            job.attach(proc)
+        try:
+            proc.stdin.write(('%d\n' % len(data)).encode('ascii'))
+            _write_chunks(proc.stdin, data)
+            proc.stdin.flush()
+            header = proc.stdout.readline().split()
+            if len(header) != 2:
+                raise IOError('server exited or sent a malformed reply')
+            status, length = int(header[0]), int(header[1])
+            payload = proc.stdout.read(length)
+            if len(payload) != length:
+                raise IOError('server exited mid-reply')
+            return (status, payload)
+        finally:
+            if job is not None:
+                job.detach(proc)
+
+    def _start(self):
+        self._stderr = bytearray()
+        self._proc = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, **self.popen_args)
+        drain = threading.Thread(
+            target=self._drain_stderr, args=(self._proc.stderr,))
+        drain.daemon = True
+        drain.start()
+
+    def _drain_stderr(self, stream):
+        for line in iter(stream.readline, b''):
+            self._stderr.extend(line)
+            del self._stderr[:-4096]
+
+    def _stop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()  # well-behaved servers exit on EOF
+        except (IOError, OSError):
+            pass
+        deadline = time.time() + 1
+        while proc.poll() is None and time.time() < deadline:
+            time.sleep(0.01)
+        if proc.poll() is None:
+            _kill_process(proc)
+            proc.wait()
+
+    def _reap(self):
+        with self._lock:
+            self._stop()
+
+    def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        self._reap()
+
+
+def shutdown_servers():
+    """Stops every pooled server process."""
+    with _servers_lock:
+        servers = list(_servers.values())
+        _servers.clear()
+    for server in servers:
+        server.close()
+
+
+def _format_size(nbytes):
+    for unit in ('bytes', 'KB', 'MB'):
+        if nbytes < 1024 or unit == 'MB':
+            break
+        nbytes /= 1024.0
+    if unit == 'bytes':
+        return '%d %s' % (nbytes, unit)
+    return '%.1f %s' % (nbytes, unit)
+
+
+_python_encodings = {}
+_ascii_compatible_codecs = {}
+_NON_ASCII = re.compile(u'[^\x00-\x7f]')
+_NON_ASCII_BYTES = re.compile(b'[^\x00-\x7f]')
+# codecs whose C implementation is already as fast as ASCII on ASCII text
+_NATIVE_CODECS = ('utf-8', 'ascii', 'iso8859-1')
+
+
+def python_encoding(name, default='UTF-8'):
+    """Maps an encoding name to a Python codec name.
+
+    Accepts Python codec names as well as SublimeText's names from
+    view.encoding(), such as "Western (Windows 1252)" or "UTF-16 LE with
+    BOM" (the BOM is left for the file, not the process). Names with no
+    matching codec, like "Undefined" or "Hexadecimal", give default.
+    """
+    if not name:
+        return default
+    try:
+        return _python_encodings[name]
+    except KeyError:
+        pass
+    candidate = name
+    if candidate.endswith(' with BOM'):
+        candidate = candidate[:-len(' with BOM')]
+    if candidate.endswith(')') and '(' in candidate:
+        candidate = candidate[candidate.index('(') + 1:-1]  # "Cyrillic (...)"
+    candidate = re.sub(r'^(?:Windows|CP) ', 'cp', candidate)
+    candidate = re.sub(r'^Mac ', 'mac-', candidate)
+    encoding = default
+    for attempt in (name, candidate.replace(' ', '-')):
+        try:
+            encoding = codecs.lookup(attempt).name
+            break
+        except LookupError:
+            pass
+    if encoding == 'undefined':  # Python's codec that always raises
+        encoding = default
+    _python_encodings[name] = encoding
+    return encoding
+
+
+def _ascii_compatible(encoding):
+    """True if the codec encodes ASCII text as plain ASCII bytes."""
+    try:
+        return _ascii_compatible_codecs[encoding]
+    except KeyError:
+        pass
+    ascii_bytes = bytes(bytearray(range(128)))
+    try:
+        compatible = (not encoding.startswith('iso2022') and  # stateful
+                      ascii_bytes.decode('ascii').encode(encoding) ==
+                      ascii_bytes)
+    except (UnicodeError, LookupError):
+        compatible = False
+    _ascii_compatible_codecs[encoding] = compatible
+    return compatible
+
+
+def _is_ascii(data):
+    if hasattr(data, 'isascii'):  # Python 3.7+
+        return data.isascii()
+    if isinstance(data, bytes):
+        return _NON_ASCII_BYTES.search(data) is None
+    return _NON_ASCII.search(data) is None
+
+
+def _fast_path(encoding, data):
+    """True if data can go through the ASCII codec instead of encoding."""
+    return (encoding not in _NATIVE_CODECS and _ascii_compatible(encoding)
+            and _is_ascii(data))
+
+
+def encode_text(text, encoding='UTF-8', errors='strict'):
+    """Encodes text, skipping slow codecs for pure-ASCII text."""
+    if _fast_path(encoding, text):
+        return text.encode('ascii')
+    return text.encode(encoding, errors)
+
+
+def decode_bytes(data, encoding='UTF-8', errors='strict'):
+    """Decodes data, skipping slow codecs for pure-ASCII data."""
+    if _fast_path(encoding, data):
+        return data.decode('ascii')
+    return data.decode(encoding, errors)
+
+
+def _incremental_encoder(encoding, errors='strict'):
+    """Returns a function encoding successive pieces of one text."""
+    if _ascii_compatible(encoding):  # stateless, so pieces encode alone
+        return lambda text: encode_text(text, encoding, errors)
+    return codecs.getincrementalencoder(encoding)(errors).encode
+
+
+def _incremental_decoder(encoding, errors='strict'):
+    """Returns a function decoding successive pieces of one byte stream."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    if encoding in _NATIVE_CODECS or not _ascii_compatible(encoding):
+        return decoder.decode
+    try:
+        decoder.getstate()
+    except (AttributeError, NotImplementedError):
+        return decoder.decode
+
+    def decode(data, final=False):
+        # ASCII bytes can only skip the codec between characters
+        if not decoder.getstate()[0] and _is_ascii(data):
+            return data.decode('ascii')
+        return decoder.decode(data, final)
+    return decode
+
+
+def _write_chunks(stream, data, chunk_size=65536):
+    """Writes data in slices of a memoryview, so none are copied."""
+    view = memoryview(data)
+    for pos in range(0, len(view), chunk_size):
+        stream.write(view[pos:pos + chunk_size])
+
+
+# What makes a command line need /bin/sh, once quoted parts are removed
+_SHELL_SYNTAX = re.compile(r'[|&;<>()$`\\*?[\]{}~#!\n\'"]')
+_SHELL_QUOTED = re.compile(r"'[^']*'|\"[^\"$`\\\\!]*\"")
+_executables = {}  # (name, PATH) -> absolute path
+
+
+def shell_words(command):
+    """Splits a shell command line into argv, if that's all sh would do.
+
+    Returns None for command lines using anything beyond words and
+    quotes: pipes, redirection, variables, globs, escapes, comments or a
+    leading VAR=value assignment.
+    """
+    if _SHELL_SYNTAX.search(_SHELL_QUOTED.sub('', command)):
+        return None
+    if PYTHON2:  # shlex needs byte strings here
+        argv = [w.decode('utf-8') for w in shlex.split(command.encode('utf-8'))]
+    else:
+        argv = shlex.split(command)
+    if not argv or '=' in argv[0]:
+        return None
+    return argv
+
+
+def find_executable(name, env=None):
+    """Absolute path of the program PATH finds for name, or None.
+
+    Lookups are remembered for each PATH.
+    """
+    path = (env or os.environ).get('PATH', os.defpath)
+    key = (name, path)
+    found = _executables.get(key)
+    if found is not None and os.path.isfile(found):
+        return found
+    if hasattr(shutil, 'which'):
+        found = shutil.which(name, path=path)
+    else:  # Python 2
+        found = None
+        for directory in path.split(os.pathsep):
+            candidate = os.path.join(directory, name)
+            if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                found = candidate
+                break
+    if found is None or not os.path.isabs(found):
+        _executables.pop(key, None)
+        return None  # left to Popen, which looks relative to its cwd
+    _executables[key] = found
+    return found
+
+
+def _direct_command(command, shell, env=None):
+    """The command and shell flag that start command most cheaply."""
+    if shell:
+        if not is_str(command):
+            return command, shell
+        argv = shell_words(command)
+        if argv is None:
+            return command, shell
+    else:
+        argv = [command] if is_str(command) else list(command)
+    if os.sep not in argv[0]:
+        found = find_executable(argv[0], env)
+        if found is None:
+            # perhaps a shell builtin or function, so let sh sort it out
+            return (command, shell) if shell else (argv, False)
+        argv[0] = found
+    return argv, False
+
+
+def _frame_records(records, framing, sentinel):
+    """Joins encoded records into a single stream for batch mode."""
+    if framing == 'length':
+        parts = []
+        for r in records:
+            parts.append(('%d\n' % len(r)).encode('ascii'))
+            parts.append(r)
+        return b''.join(parts)
+    terminator = _record_terminator(framing, sentinel)
+    return b''.join(r + terminator for r in records)
+
+
+def _split_records(data, framing, sentinel):
+    """Inverse of _frame_records. Raises ValueError on malformed input."""
+    if framing == 'length':
+        records = []
+        pos = 0
+        while pos < len(data):
+            newline = data.index(b'\n', pos)
+            end = newline + 1 + int(data[pos:newline])
+            if end > len(data):
+                raise ValueError('truncated record')
+            records.append(data[newline + 1:end])
+            pos = end
+        return records
+    terminator = _record_terminator(framing, sentinel)
+    if framing == 'line' and data.endswith(terminator[:-1]):
+        data += b'\n'  # tolerate a missing final newline
+    records = data.split(terminator)
+    if records[-1]:
+        raise ValueError('unterminated record')
+    return records[:-1]
+
+
+def _record_terminator(framing, sentinel):
+    if framing == 'nul':
+        return b'\0'
+    if framing == 'line':
+        return b'\n' + sentinel.encode('UTF-8') + b'\n'
+    raise ValueError('unknown batch framing: %r' % (framing,))
+
+
 class FilterPipesProcessCommand(FilterPipesCommandBase):
     """Generic base for Process-based filter commands.
 
     Override self.command or self.getcommand() to specify which command to run,
     or pass in at run time as a configuration parameter. Set "shell" to true to
     execute as a shell command instead of direct process invocation.
+
+    Set "streaming" to pipe each selection through in chunk_size pieces
+    instead of encoding and buffering it whole, for very large inputs.
+
+    Set "server" for commands that are expensive to start and can handle
+    many requests: the command is started once, kept in a pool shared by
+    all views, and sent each input as a line holding its byte length
+    followed by the bytes. It replies on stdout with a "<status> <length>"
+    line followed by the bytes, where a nonzero status marks the bytes as
+    an error message. Crashed servers are restarted, and idle ones exit
+    after server_idle_timeout seconds (null or 0: kept until unload).
+
+    Set "batch" to send every selection through a single invocation of the
+    command instead of one process per selection. The selections are framed
+    into one stdin stream and the output is split back the same way, so the
+    command must preserve the framing: "nul" terminates each record with a
+    NUL byte, "line" with a line holding batch_sentinel, and "length"
+    prefixes each record with its byte length and a newline.
+
+    Set "fast_spawn" to cut the cost of starting each process. A shell
+    command line that uses no shell syntax is split into words and run
+    directly instead of through /bin/sh, and programs are looked up on
+    PATH once and remembered rather than searched for by every exec.
+    POSIX only.
+
+    Text is sent to the command in input_encoding and its output read back
+    in output_encoding. Both default to the view's encoding (UTF-8 when it
+    has none), and accept Python codec names as well as SublimeText's.
+    encoding_errors and decoding_errors are the codec error handlers
+    ("strict", "replace", "ignore", ...); with "strict", text the codec
+    can't handle fails the filter instead of being altered.
     """
     command = []
     use_selections = True
     shell = False
     report_failure = False  # we do our own failure reporting
+    _last_error = None  # short message of the last error reported
     expected_returns = [0]
     subprocess_args = {}
+    batch = False  # or one of "nul", "line", "length"
+    batch_sentinel = '--FilterPipes record--'
+    asynchronous = False
+    timeout = None
+    streaming = False
+    chunk_size = 65536
+    max_stderr = 65536
+    server = False
+    server_idle_timeout = 300  # null or 0: never stop idle servers
+    fast_spawn = False
+    input_encoding = None  # default: the view's encoding
+    output_encoding = None  # default: input_encoding
+    encoding_errors = 'strict'
+    decoding_errors = 'strict'
+    bytes_in = 0
+    bytes_out = 0
+    _job = None
+
+    def run(self, edit, **settings):
+        # Checked before run() touches any state: Sublime reuses this
+        # instance, and a running asynchronous filter may be using it.
+        if (settings.get('asynchronous', type(self).asynchronous) and
+                self.view.id() in _running_jobs):
+            sublime.status_message(
+                'FilterPipes: a filter is already running in this view')
+            return
+        super(FilterPipesProcessCommand, self).run(edit, **settings)
+
+    def do_replacements(self, edit):
+        self.bytes_in = self.bytes_out = 0
+        job = _ProcessJob(self.get_command_as_str())
+        if self.timeout:
+            job.start_timeout(float(self.timeout))
+        if not self.asynchronous:
+            self._job = job
+            try:
+                super(FilterPipesProcessCommand, self).do_replacements(edit)
+            finally:
+                job.finish()
+            return
+        view = self.view
+        regions = self._regions()
+        texts = None
+        if not self.streaming:
+            start = _clock()
+            texts = [view.substr(r) for r in regions]
+            self.metrics.add('read', start)
+        self.metrics.deferred = True
+        # The worker gets its own copy holding this run's settings, job
+        # and metrics, so later runs of this instance can't change them.
+        runner = copy.copy(self)
+        runner._job = job
+        _running_jobs[view.id()] = job
+        worker = threading.Thread(
+            target=runner._run_async,
+            args=(job, regions, texts, view.change_count()))
+        worker.daemon = True
+        worker.start()
+        job.show_progress(view)
+
+    def _run_async(self, job, regions, texts, change_count):
+        """Filters on a worker thread, then hands results to the UI thread."""
+        self.success = False
+        self.replaced = False
+        replacements = []
+        try:
+            replacements = self._get_replacements(regions, texts)
+            message = self._result_message()
+            if message and self.show_metrics:
+                message = '%s %s' % (message, self.metrics.summary())
+        except Exception as ex:
+            # like run(), which only reports errors if errors_on_statusbar
+            message = str(ex) if self.errors_on_statusbar else None
+            raise
+        finally:
+            job.finish()
+            args = {
+                'replacements': [[r.a, r.b, text] for r, text in replacements],
+                'change_count': change_count,
+                'message': message,
+            }
+            sublime.set_timeout(lambda: self._finish_async(args), 0)
+
+    def _finish_async(self, args):
+        _running_jobs.pop(self.view.id(), None)
+        self.view.erase_status('filterpipes')
+        if args['replacements']:
+            start = _clock()
+            self.view.run_command('filter_pipes_apply', args)
+            self.metrics.add('commit', start)
+        elif args['message']:
+            sublime.status_message(args['message'])
+        self._emit_metrics()
+
+    def _emit_metrics(self):
+        self.metrics.count('bytes_in', self.bytes_in)
+        self.metrics.count('bytes_out', self.bytes_out)
+        super(FilterPipesProcessCommand, self)._emit_metrics()
+
+    def cache_state(self):
+        # the encodings default to the view's
+        return (self.get_input_encoding(), self.get_output_encoding())
+
+    def get_input_encoding(self):
+        """Python codec for the command's stdin."""
+        return python_encoding(self.input_encoding or self.view.encoding())
+
+    def get_output_encoding(self):
+        """Python codec for the command's stdout and stderr."""
+        return python_encoding(self.output_encoding or self.input_encoding or
+                               self.view.encoding())
+
+    def encode_input(self, text):
+        start = _clock()
+        try:
+            return encode_text(text, self.get_input_encoding(),
+                               self.encoding_errors)
+        finally:
+            self.metrics.add('encode', start)
+
+    def decode_output(self, data):
+        start = _clock()
+        try:
+            return decode_bytes(data, self.get_output_encoding(),
+                                self.decoding_errors)
+        finally:
+            self.metrics.add('decode', start)
+
+    def _report_codec_error(self, ex):
+        self._report_error(
+            'FilterPipes: [%s] %s' % (self.get_command_as_str(), ex),
+            'Command [%s]: %s\n' % (self.get_command_as_str(False), ex))
+
+    def _popen_args(self, command, new_session=False):
+        """Returns the command to start and keyword arguments for Popen."""
+        args = dict(self.subprocess_args or {})
+        shell = self.shell
+        if self.fast_spawn and os.name == 'posix':
+            command, shell = _direct_command(command, shell, args.get('env'))
+        args['shell'] = shell
+        if new_session and os.name == 'posix':
+            # own process group, so a kill takes any children along
+            if PYTHON2:
+                args['preexec_fn'] = os.setsid
+            else:
+                args['start_new_session'] = True
+        return command, args
+
+    def _spawn(self, command):
+        """Starts the command with all three standard streams piped."""
+        start = _clock()
+        command, args = self._popen_args(
+            command, self.timeout or self.asynchronous)
+        cmd = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, **args)
+        self.metrics.add('spawn', start)
+        self.metrics.count('spawns')
+        if self._job is not None:
+            self._job.attach(cmd)
+        return cmd
 
     def _execute_raw(self, command, text):
         """Executes a command and returns stdout, stderr, and return code."""
-        args = self.subprocess_args or {}
-        args['shell'] = self.shell
-        cmd = subprocess.Popen(command,
-                               stdin=subprocess.PIPE,
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE, **args)
-        (stdout, stderr) = cmd.communicate(text.encode('UTF-8'))
+        if not isinstance(text, bytes):
+            text = self.encode_input(text)
+        if self.server:
+            return self._execute_server(command, text)
+        cmd = self._spawn(command)
+        start = _clock()
+        try:
+            (stdout, stderr) = cmd.communicate(text)
+        finally:
+            self.metrics.add('wait', start)
+            if self._job is not None:
+                self._job.detach(cmd)
+        self.bytes_in += len(text)
+        self.bytes_out += len(stdout)
         return (stdout, stderr, cmd.returncode)
 
-    def _expect_success(self, command, text):
+    def _execute_server(self, command, data):
+        """Sends data to a pooled co-process instead of spawning one."""
+        key = (repr(command), bool(self.shell),
+               repr(sorted((self.subprocess_args or {}).items())))
+        with _servers_lock:
+            server = _servers.get(key)
+            if server is None:
+                server = _servers[key] = _CoProcess(
+                    key, *self._popen_args(command, new_session=True))
+        start = _clock()
+        try:
+            status, payload = server.request(
+                data, self._job, float(self.server_idle_timeout or 0))
+            self.metrics.add('wait', start)
+        except OSError:
+            if self._job is not None and self._job.stop_reason:
+                return (b'', b'', -signal.SIGKILL)  # reported as stopped
+            raise
+        self.bytes_in += len(data)
+        self.bytes_out += len(payload)
+        if status:
+            return (b'', payload, status)
+        return (payload, b'', status)
+
+    def _run_checked(self, command, data):
+        """Executes a command, returning stdout bytes or None on failure."""
+        if self._job is not None and self._job.stop_reason:
+            return None  # already reported
         try:
-            stdout, stderr, status = self._execute_raw(command, text)
-            if not self.expected_returns or status in self.expected_returns:
-                return stdout.decode('UTF-8')
+            stdout, stderr, status = self._execute_raw(command, data)
         except OSError as e:
-            stdout, stderr, status = (None, str(e), e.errno)
+            self._report_failure(e.errno, str(e))
+            return None
+        except UnicodeEncodeError as e:
+            self._report_codec_error(e)
+            return None
+        if self._check_status(status, stderr):
+            return stdout
+        return None
 
-        if self.errors_on_statusbar:
-            sublime.status_message(
-                'Error %i executing command [%s]: %s' %
-                (status, self.get_command_as_str(), stderr))
-        print(
+    def _check_status(self, status, stderr):
+        """Reports a killed or failed run. Returns True if it succeeded."""
+        job = self._job
+        if job is not None and job.stop_reason:
+            self._report_error(
+                'FilterPipes: [%s] %s' %
+                (self.get_command_as_str(), job.stop_reason),
+                'Command [%s] %s\n' %
+                (self.get_command_as_str(False), job.stop_reason))
+            return False
+        if not self.expected_returns or status in self.expected_returns:
+            return True
+        self._report_failure(
+            status, decode_bytes(stderr, self.get_output_encoding(), 'replace'))
+        return False
+
+    def _report_failure(self, status, stderr):
+        self._report_error(
+            'Error %i executing command [%s]: %s' %
+            (status, self.get_command_as_str(), stderr),
             'Error %i executing command [%s]:\n%s\n' %
             (status, self.get_command_as_str(False), stderr))
-        return None
+
+    def _get_replacement(self, region, existing=None):
+        if not self.streaming or self.server:
+            return super(FilterPipesProcessCommand, self)._get_replacement(
+                region, existing)
+        start = _clock()
+        filtered = self._stream_region(region)
+        self.metrics.add('filter', start)
+        self.metrics.count('regions')
+        self.metrics.count('chars_in', region.size())
+        if filtered is None:
+            return None
+        self.metrics.count('chars_out', len(filtered))
+        self.success = True
+        if self._region_matches(region, filtered):
+            return None
+        self.replaced = True
+        return (region, filtered)
+
+    def _stream_region(self, region):
+        """Pipes a region through the command in chunks read from the view.
+
+        Neither the input nor the raw output is held in memory as a whole;
+        output is decoded as it arrives, and only the last max_stderr bytes
+        of stderr are kept.
+
+        Returns:
+          the decoded output, or None on failure.
+        """
+        if self._job is not None and self._job.stop_reason:
+            return None
+        try:
+            cmd = self._spawn(self.get_command())
+        except OSError as e:
+            self._report_failure(e.errno, str(e))
+            return None
+        chunk_size = int(self.chunk_size)
+        output = []
+        stderr = bytearray()
+        codec_errors = []
+        encode = _incremental_encoder(self.get_input_encoding(),
+                                      self.encoding_errors)
+        readers = [
+            threading.Thread(target=self._read_decoded,
+                             args=(cmd.stdout, chunk_size, output,
+                                   codec_errors)),
+            threading.Thread(target=self._read_tail,
+                             args=(cmd.stderr, chunk_size, stderr)),
+        ]
+        for reader in readers:
+            reader.daemon = True
+            reader.start()
+        try:
+            pos, end = region.begin(), region.end()
+            while pos < end:
+                data = self.view.substr(
+                    sublime.Region(pos, min(pos + chunk_size, end)))
+                data = encode(data)
+                cmd.stdin.write(data)
+                self.bytes_in += len(data)
+                pos += chunk_size
+            cmd.stdin.close()
+        except (IOError, OSError):
+            pass  # the command quit early; its status tells us why
+        except UnicodeEncodeError as e:
+            codec_errors.append(e)
+            _kill_process(cmd)
+        for reader in readers:
+            reader.join()
+        status = cmd.wait()
+        if self._job is not None:
+            self._job.detach(cmd)
+        if codec_errors:
+            self._report_codec_error(codec_errors[0])
+            return None
+        if not self._check_status(status, bytes(stderr)):
+            return None
+        return ''.join(output)
+
+    def _read_decoded(self, stream, chunk_size, output, codec_errors):
+        decode = _incremental_decoder(self.get_output_encoding(),
+                                      self.decoding_errors)
+        while True:
+            data = stream.read(chunk_size)
+            if not data:
+                break
+            self.bytes_out += len(data)
+            if not codec_errors:  # after an error, just drain the pipe
+                try:
+                    output.append(decode(data))
+                except UnicodeDecodeError as e:
+                    codec_errors.append(e)
+        if not codec_errors:
+            try:
+                output.append(decode(b'', True))
+            except UnicodeDecodeError as e:
+                codec_errors.append(e)
+        stream.close()
+
+    def _read_tail(self, stream, chunk_size, buf):
+        limit = max(int(self.max_stderr or 0), 0)
+        while True:
+            data = stream.read(chunk_size)
+            if not data:
+                break
+            buf.extend(data)
+            if len(buf) > limit:
+                del buf[:len(buf) - limit]  # not [:-limit]: limit may be 0
+        stream.close()
+
+    def _region_matches(self, region, text):
+        """Compares a region to text without copying the region whole."""
+        if region.size() != len(text):
+            return False
+        chunk_size = int(self.chunk_size)
+        begin = region.begin()
+        for pos in range(0, len(text), chunk_size):
+            end = min(pos + chunk_size, len(text))
+            if self.view.substr(
+                    sublime.Region(begin + pos, begin + end)) != text[pos:end]:
+                return False
+        return True
+
+    def _report_error(self, short_msg, long_msg):
+        self._last_error = short_msg
+        if self.errors_on_statusbar:
+            sublime.status_message(short_msg)
+        print(long_msg)
+
+    def _expect_success(self, command, text):
+        stdout = self._run_checked(command, text)
+        if stdout is None:
+            return None
+        try:
+            return self.decode_output(stdout)
+        except UnicodeDecodeError as e:
+            self._report_codec_error(e)
+            return None
+
+    def _get_replacements(self, regions, texts=None):
+        if not self.batch:
+            return super(FilterPipesProcessCommand, self)._get_replacements(
+                regions, texts)
+        if texts is None:
+            start = _clock()
+            texts = [self.view.substr(r) for r in regions]
+            self.metrics.add('read', start)
+        start = _clock()
+        outputs = self.filter_batch(texts)
+        self.metrics.add('filter', start)
+        if outputs is None:
+            return []
+        replacements = []
+        for region, existing, filtered in zip(regions, texts, outputs):
+            replacement = self._make_replacement(region, existing, filtered)
+            if replacement:
+                replacements.extend(
+                    self._split_replacement(replacement, existing))
+        return replacements
+
+    def filter_batch(self, texts):
+        """Filters several texts through one invocation of the command.
+
+        Returns:
+          list of filtered strings in the same order as texts, or None
+          if the command failed or did not return one record per text.
+        """
+        framing = 'nul' if self.batch is True else self.batch
+        try:
+            data = _frame_records([self.encode_input(t) for t in texts],
+                                  framing, self.batch_sentinel)
+        except UnicodeEncodeError as e:
+            self._report_codec_error(e)
+            return None
+        stdout = self._run_checked(self.get_command(), data)
+        if stdout is None:
+            return None
+        try:
+            records = _split_records(stdout, framing, self.batch_sentinel)
+        except ValueError:
+            records = None
+        if records is None or len(records) != len(texts):
+            found = 'malformed output' if records is None else (
+                '%d records' % len(records))
+            self._report_error(
+                'Batch error from [%s]: expected %d records, got %s' %
+                (self.get_command_as_str(), len(texts), found),
+                'Batch error from [%s]: expected %d records, got %s\n' %
+                (self.get_command_as_str(False), len(texts), found))
+            return None
+        try:
+            return [self.decode_output(r) for r in records]
+        except UnicodeDecodeError as e:
+            self._report_codec_error(e)
+            return None
 
     def filter(self, existing):
         return self._expect_success(self.get_command(), existing)
@@ -218,26 +1608,170 @@ class FilterPipesProcessCommand(FilterPipesCommandBase):
         return ' '.join(c)
 
     def success_message(self):
+        if self.streaming:
+            return 'Filtered through: %s (%s in, %s out)' % (
+                self.get_command_as_str(), _format_size(self.bytes_in),
+                _format_size(self.bytes_out))
         return 'Filtered through: %s' % (self.get_command_as_str())
 
+    def failure_message(self):
+        if self._last_error:
+            return self._last_error
+        return super(FilterPipesProcessCommand, self).failure_message()
+
+
+def expand_ranges(spec):
+    """Expands tr-style ranges: "a-f0-9" becomes "abcdef0123456789".
+
+    A backslash makes the next character literal, so "\\-" is a dash and
+    "\\\\" a backslash. A dash at either end is literal too.
+
+    Raises:
+      ValueError: for a range whose end comes before its start.
+    """
+    chars = []
+    i = 0
+    while i < len(spec):
+        c, i = _range_char(spec, i)
+        if i + 1 < len(spec) and spec[i] == '-':
+            end, i = _range_char(spec, i + 1)
+            if end < c:
+                raise ValueError(
+                    'FilterPipes: reversed range "%s-%s"' % (c, end))
+            chars.extend(unichr(o) for o in range(ord(c), ord(end) + 1))
+        else:
+            chars.append(c)
+    return u''.join(chars)
+
+
+def _range_char(spec, i):
+    if spec[i] == '\\' and i + 1 < len(spec):
+        return spec[i + 1], i + 2
+    return spec[i], i + 1
+
+
+class _Translation(object):
+    """A str.translate table, plus a bytes.translate version if possible.
+
+    The bytes version exists when every character the table maps to is
+    latin-1, and is used for text that is all latin-1 too: translating
+    the text's latin-1 bytes is a single pass in C, where str.translate
+    looks up each character in the dict (except for ASCII text and
+    tables on Python 3.5+, which it already handles that way). A few
+    characters beyond latin-1, such as curly quotes, are first replaced
+    with str.replace so the rest of the text can take the same path.
+    """
+    # str.translate's own ASCII fast path arrived in Python 3.5
+    STR_ASCII_FAST = sys.version_info >= (3, 5)
+    MAX_WIDE = 16  # str.replace passes worth making before translating
+
+    def __init__(self, table):
+        self.table = table
+        self.byte_table = None
+        self.byte_delete = None
+        self.wide = ()
+        self.ascii_fast = self.STR_ASCII_FAST
+        byte_table = bytearray(range(256))
+        delete = bytearray()
+        wide = []
+        for key, value in table.items():
+            if is_str(value):
+                if len(value) != 1:
+                    return  # multi-character replacements
+                value = ord(value)
+            if value is not None and value > 255:
+                return
+            if key > 255:
+                wide.append((unichr(key),
+                             u'' if value is None else unichr(value)))
+            elif value is None:
+                delete.append(key)
+            else:
+                byte_table[key] = value
+                if key < 128 and value > 127:
+                    self.ascii_fast = False
+        # replacing first is only safe if nothing translates the results
+        if len(wide) <= self.MAX_WIDE and all(
+                byte_table[ord(v)] == ord(v) and ord(v) not in delete
+                for _, v in wide if v):
+            self.wide = wide
+        self.byte_table = bytes(byte_table)
+        self.byte_delete = bytes(delete)
+
+    def translate(self, data):
+        if self.byte_table is not None and not (
+                self.ascii_fast and _is_ascii(data)):
+            text = data
+            for key, value in self.wide:
+                text = text.replace(key, value)
+            try:
+                raw = text.encode('latin-1')
+            except UnicodeEncodeError:
+                pass
+            else:
+                return raw.translate(
+                    self.byte_table, self.byte_delete).decode('latin-1')
+        return data.translate(self.table)
+
+
+_translations = LRUCache(64)
+
 
 class FilterPipesTranslateCommand(FilterPipesCommandBase):
     """Translates characters from one set to another.
 
-    Like the tr shell command.
+    Like the tr shell command: each character of "before" becomes the
+    character at the same position in "after" (whose last character is
+    repeated if it is the shorter), and characters in "delete" are
+    removed. With "ranges" set, all three expand tr-style ranges such as
+    "a-z" (see expand_ranges). Prepared tables are cached across runs.
 
     """
     before = None
     after = None
+    delete = None
+    ranges = False
+    line_local = True
+
+    def prepared_translation(self):
+        """_Translation for the settings, or None if not configured."""
+        key = (self.before, self.after, self.delete, bool(self.ranges))
+        translation = _translations.get(key)
+        if translation is None:
+            table = self._build_table()
+            if table is None:
+                return None
+            translation = _Translation(table)
+            _translations.put(key, translation)
+        return translation
+
+    def _build_table(self):
+        before, after, delete = self.before, self.after, self.delete
+        if self.ranges:
+            before, after, delete = [expand_ranges(x or '')
+                                     for x in (before, after, delete)]
+        if not (before and after) and not delete:
+            return None
+        table = {}
+        if before and after:
+            after = after[:len(before)]
+            after += after[-1] * (len(before) - len(after))
+            for b, a in zip(before, after):
+                table[ord(b)] = ord(a)
+        for c in delete or '':
+            table[ord(c)] = None
+        return table
+
+    def translation_table(self):
+        """Mapping for str.translate, or None if not configured."""
+        translation = self.prepared_translation()
+        return translation and translation.table
 
     def filter(self, data):
-        if not self.before or not self.after:
+        translation = self.prepared_translation()
+        if translation is None:
             return None
-        if PYTHON2:
-            trans = dict(zip([ord(c) for c in self.before], self.after))
-        else:
-            trans = str.maketrans(self.before,self.after)
-        return data.translate(trans)
+        return translation.translate(data)
 
 
 class FilterPipesRegexCommand(FilterPipesCommandBase):
@@ -246,29 +1780,769 @@ class FilterPipesRegexCommand(FilterPipesCommandBase):
     Because re.sub is magic, replacement can be either a string or a
     function that takes a match object.
 
+    The pattern is compiled once per run (in post_init) through a shared
+    cache, so subclasses overriding post_init should call up to it after
+    setting self.regex.
+
+    Set "time_budget" (in seconds) to guard against patterns that
+    backtrack for ever. Selections of at least guard_min_size characters,
+    and any selection when risky_pattern() flags the regex, are then
+    matched in a forked worker process that is killed if it runs over
+    budget, leaving the text unchanged. Smaller selections with safe
+    patterns still run in-thread. Forking is required, so the guard is
+    POSIX only.
+
     """
     regex = None
     replacement = None
     flags = 0
     count = 0
     lines = False
+    time_budget = None
+    guard_min_size = 256 * 1024
+    _compiled = None
+    _risky = False
+    _timed_out = False
+
+    def effective_flags(self):
+        """Flags to compile with, including those implied by settings."""
+        flags = int(self.flags)
+        if self.lines:
+            flags |= re.MULTILINE
+        return flags
+
+    def post_init(self):
+        self._compiled = None
+        self._risky = False
+        self._timed_out = False
+        if self.regex is not None:
+            self._compiled = compile_pattern(self.regex, self.effective_flags())
+            if self.time_budget:
+                self._risky = risky_pattern(self._compiled)
+
+    def timeout_message(self):
+        pattern = self.regex
+        if not is_str(pattern):
+            pattern = pattern.pattern
+        return 'FilterPipes: regex timed out after %gs: %s' % (
+            float(self.time_budget), pattern)
+
+    def failure_message(self):
+        if self._timed_out:
+            return self.timeout_message()
+        return super(FilterPipesRegexCommand, self).failure_message()
+
+    def _result_message(self):
+        # a timed-out selection is left unchanged even if others succeeded
+        if self._timed_out and self.success:
+            return '%s (other selections filtered)' % self.timeout_message()
+        return super(FilterPipesRegexCommand, self)._result_message()
 
     def filter(self, data):
         if self.regex is None or self.replacement is None:
             return None
-        if self.lines:
-            self.flags |= re.MULTILINE
-        return re.sub(self.regex, self.replacement, data,
-                      count=self.count, flags=self.flags)
+        pattern = self._compiled
+        if pattern is None:  # post_init was overridden without chaining up
+            pattern = compile_pattern(self.regex, self.effective_flags())
+        if self.time_budget and (self._risky or
+                                 len(data) >= int(self.guard_min_size)):
+            context = _fork_context()
+            if context is not None:
+                return self._sub_guarded(context, pattern, data)
+        return pattern.sub(self.replacement, data, count=self.count)
 
+    def _sub_guarded(self, context, pattern, data):
+        """Runs the substitution in a child process, within time_budget."""
+        receiver, sender = context.Pipe(False)
+        worker = context.Process(
+            target=_regex_worker,
+            args=(sender, pattern, self.replacement, data, self.count))
+        worker.daemon = True
+        worker.start()
+        sender.close()
+        try:
+            if not receiver.poll(float(self.time_budget)):
+                self._timed_out = True
+                return None
+            try:
+                ok, result = receiver.recv()
+            except EOFError:
+                ok, result = False, 'regex worker exited unexpectedly'
+        finally:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+            receiver.close()
+        self.metrics.count('guarded_regions')
+        if not ok:
+            raise RuntimeError(result)
+        return result
 
-class FilterPipesExecPromptCommand(sublime_plugin.TextCommand):
-    """Prompt for a command to filter text through."""
+
+def _regex_worker(conn, pattern, replacement, data, count):
+    """Forked worker for FilterPipesRegexCommand's time budget."""
+    try:
+        conn.send((True, pattern.sub(replacement, data, count=count)))
+    except Exception as ex:
+        conn.send((False, '%s: %s' % (type(ex).__name__, ex)))
+    finally:
+        conn.close()
+
+
+class FilterPipesApplyCommand(FilterPipesCommandBase):
+    """Commits replacements computed by an asynchronous filter run.
+
+    The replacements are dropped if the buffer changed since the filter
+    started, as their regions no longer line up with the text.
+    """
+
+    def run(self, edit, replacements, change_count=None, message=None,
+            **settings):
+        self.apply_settings(settings)
+        if (change_count is not None and
+                self.view.change_count() != change_count):
+            sublime.status_message(
+                'FilterPipes: buffer changed while filtering; '
+                'result discarded')
+            return
+        for a, b, text in reversed(replacements):
+            self._commit_replacement(edit, (sublime.Region(a, b), text))
+        if message:
+            sublime.status_message(message)
+
+
+class FilterPipesCancelCommand(sublime_plugin.TextCommand):
+    """Kills the asynchronous filter running in this view, if any."""
 
     def run(self, edit):
+        job = _running_jobs.get(self.view.id())
+        if job is not None:
+            job.stop('cancelled')
+
+    def is_enabled(self):
+        return self.view.id() in _running_jobs
+
+
+class FilterPipesPipelineCommand(FilterPipesCommandBase):
+    """Runs text through several filter commands, committing once.
+
+    "stages" is a list of {"command": name, "args": {...}} entries, each
+    naming any FilterPipes command. The text is passed from stage to stage
+    in memory and the result replaces the selection in a single undo step.
+    Adjacent translate stages are merged into one table, and adjacent
+    process stages are connected directly with OS pipes.
+    """
+    stages = []
+
+    def post_init(self):
+        self._stages = self._build_stages()
+
+    def filter(self, data):
+        for stage in self._stages:
+            data = stage(data)
+            if data is None:
+                return None
+        return data
+
+    def _build_stages(self):
+        groups = []  # [kind, [command instances]]
+        for spec in self.stages:
+            cls = find_command_class(spec['command'])
+            if cls is None:
+                raise ValueError(
+                    'FilterPipes: unknown pipeline command: %s' %
+                    (spec['command'],))
+            stage = cls(self.view)
+            stage.apply_settings(spec.get('args', {}))
+            stage.post_init()
+            kind = None
+            if isinstance(stage, FilterPipesTranslateCommand):
+                kind = 'translate'
+            elif (isinstance(stage, FilterPipesProcessCommand) and
+                    not stage.server and not stage.batch):
+                kind = 'process'
+            if kind and groups and groups[-1][0] == kind:
+                groups[-1][1].append(stage)
+            else:
+                groups.append([kind, [stage]])
+        callables = []
+        for kind, group in groups:
+            if len(group) == 1:
+                callables.append(group[0].filter)
+            elif kind == 'translate':
+                callables.append(self._fused_translate(group))
+            else:
+                callables.append(
+                    lambda data, group=group: self._pipe_through(group, data))
+        return callables
+
+    def _fused_translate(self, stages):
+        tables = [stage.translation_table() for stage in stages]
+        if None in tables:
+            return lambda data: None
+        table = tables[0]
+        for other in tables[1:]:
+            table = _compose_tables(table, other)
+        return _Translation(table).translate
+
+    def _pipe_through(self, stages, data):
+        """Runs data through a chain of processes joined stdout to stdin.
+
+        The text is encoded for the first stage and decoded from the last;
+        bytes pass between the stages unchanged.
+        """
+        try:
+            data = stages[0].encode_input(data)
+        except UnicodeEncodeError as e:
+            stages[0]._report_codec_error(e)
+            return None
+        procs = []
+        try:
+            for stage in stages:
+                command, args = stage._popen_args(stage.get_command())
+                proc = subprocess.Popen(
+                    command,
+                    stdin=procs[-1].stdout if procs else subprocess.PIPE,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, **args)
+                if procs:
+                    procs[-1].stdout.close()  # now owned by the next stage
+                procs.append(proc)
+        except OSError as e:
+            for proc in procs:
+                _kill_process(proc)
+                proc.wait()
+            stage._report_failure(e.errno, str(e))
+            return None
+        errors = [bytearray() for _ in procs]
+        threads = [threading.Thread(target=_write_and_close,
+                                    args=(procs[0].stdin, data))]
+        for proc, buf in zip(procs, errors):
+            threads.append(threading.Thread(
+                target=_read_into, args=(proc.stderr, buf)))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        stdout = procs[-1].stdout.read()
+        for thread in threads:
+            thread.join()
+        statuses = [proc.wait() for proc in procs]
+        # check downstream first: upstream failures are often just SIGPIPE
+        for stage, status, buf in reversed(list(zip(stages, statuses, errors))):
+            if not stage._check_status(status, bytes(buf)):
+                return None
+        try:
+            return stages[-1].decode_output(stdout)
+        except UnicodeDecodeError as e:
+            stages[-1]._report_codec_error(e)
+            return None
+
+
+def _compose_tables(first, second):
+    """Combines two str.translate tables into one applying both in turn."""
+    table = dict(second)
+    for key, value in first.items():
+        if value is None:
+            table[key] = None
+        elif is_str(value):
+            table[key] = value.translate(second)
+        else:
+            table[key] = second.get(value, value)
+    return table
+
+
+def _write_and_close(stream, data):
+    try:
+        _write_chunks(stream, data)
+        stream.close()
+    except (IOError, OSError):
+        pass  # reader exited early; its status tells us why
+
+
+def _read_into(stream, buf):
+    for chunk in iter(lambda: stream.read(65536), b''):
+        buf.extend(chunk)
+    stream.close()
+
+
+def command_name(cls):
+    """Returns the name Sublime gives a command class.
+
+    Mirrors sublime_plugin: FilterPipesRegexCommand -> filter_pipes_regex.
+    """
+    clsname = cls.__name__
+    name = clsname[0].lower()
+    last_upper = False
+    for c in clsname[1:]:
+        if c.isupper() and not last_upper:
+            name += '_' + c.lower()
+        else:
+            name += c
+        last_upper = c.isupper()
+    if name.endswith('_command'):
+        name = name[:-8]
+    return name
+
+
+def find_command_class(name):
+    """Finds the loaded FilterPipes command class with the given name."""
+    found = None
+    pending = [FilterPipesCommandBase]
+    while pending:
+        cls = pending.pop()
+        if command_name(cls) == name:
+            found = cls
+        pending.extend(cls.__subclasses__())
+    return found
+
+
+PREVIEW_PANEL = 'filterpipes_preview'
+
+
+def _output_panel(window, name):
+    if hasattr(window, 'create_output_panel'):  # ST3
+        return window.create_output_panel(name)
+    return window.get_output_panel(name)
+
+
+class FilterPipesExecPromptCommand(sublime_plugin.TextCommand):
+    """Prompt for a command to filter text through.
+
+    With preview set, the command is also run as you type: once typing
+    pauses for preview_delay milliseconds, it filters a sample of at most
+    preview_size characters from the selections (or the top of the file)
+    in the background and shows the result in an output panel. A preview
+    still running when the command line changes again is killed, as is
+    one that takes longer than preview_timeout seconds. The buffer is
+    only filtered when the prompt is confirmed with Enter.
+    """
+
+    def run(self, edit, preview=False, preview_size=16384, preview_delay=300,
+            preview_timeout=5):
+        self._generation = 0
+        self._preview_job = None
+        on_change = on_cancel = None
+        if preview:
+            self._preview_size = int(preview_size)
+            self._preview_delay = int(preview_delay)
+            self._preview_timeout = float(preview_timeout)
+            on_change, on_cancel = self.on_change, self.on_cancel
         self.view.window().show_input_panel(
-            'Filter Command:', '', self.on_done, None, None)
+            'Filter Command:', '', self.on_done, on_change, on_cancel)
 
     def on_done(self, text):
+        self._end_preview()
         self.view.run_command(
-            'filter_pipes_process', {'command': text, 'shell': True})
+            'filter_pipes_process',
+            {'command': text, 'shell': True, 'asynchronous': True,
+             'fast_spawn': True})
+
+    def on_cancel(self):
+        self._end_preview()
+
+    def on_change(self, text):
+        self._generation += 1
+        generation = self._generation
+        sublime.set_timeout(lambda: self._start_preview(text, generation),
+                            self._preview_delay)
+
+    def _end_preview(self):
+        self._generation += 1  # makes any pending preview stale
+        if self._preview_job is not None:
+            self._preview_job.stop('superseded')
+            self._preview_job = None
+        window = self.view.window()
+        if window is not None:
+            window.run_command('hide_panel',
+                               {'panel': 'output.' + PREVIEW_PANEL})
+
+    def _start_preview(self, text, generation):
+        if generation != self._generation:
+            return  # still typing
+        if self._preview_job is not None:
+            self._preview_job.stop('superseded')
+            self._preview_job = None
+        if not text.strip():
+            return
+        job = self._preview_job = _ProcessJob(text)
+        job.start_timeout(self._preview_timeout)
+        worker = threading.Thread(
+            target=self._run_preview,
+            args=(text, self._preview_sample(), job, generation))
+        worker.daemon = True
+        worker.start()
+
+    def _preview_sample(self):
+        """Texts of the selections, cut to preview_size characters total."""
+        regions = [r for r in self.view.sel() if not r.empty()]
+        if not regions:
+            regions = [sublime.Region(0, self.view.size())]
+        remaining = self._preview_size
+        sample = []
+        for region in regions:
+            if remaining <= 0:
+                break
+            end = min(region.end(), region.begin() + remaining)
+            text = self.view.substr(sublime.Region(region.begin(), end))
+            if end < region.end() and '\n' in text:
+                text = text[:text.rindex('\n') + 1]  # whole lines only
+            sample.append(text)
+            remaining -= len(text)
+        return sample
+
+    def _run_preview(self, command, sample, job, generation):
+        runner = FilterPipesProcessCommand(self.view)
+        runner.apply_settings({'command': command, 'shell': True,
+                               'fast_spawn': True,
+                               'timeout': self._preview_timeout})
+        runner._job = job
+        outputs = []
+        try:
+            for text in sample:
+                stdout, stderr, status = runner._execute_raw(
+                    runner.get_command(), text)
+                if job.stop_reason:
+                    if job.stop_reason == 'superseded':
+                        return
+                    outputs.append('[%s]' % job.stop_reason)
+                    break
+                encoding = runner.get_output_encoding()
+                if stdout or not status:
+                    outputs.append(decode_bytes(stdout, encoding, 'replace'))
+                if status:
+                    outputs.append('[exit status %d] %s' % (
+                        status, decode_bytes(stderr, encoding, 'replace')))
+                    break
+        except (OSError, UnicodeError) as e:
+            outputs.append('[%s]' % e)
+        finally:
+            job.finish()
+        result = '\n'.join(outputs)
+        sublime.set_timeout(lambda: self._show_preview(result, generation), 0)
+
+    def _show_preview(self, result, generation):
+        if generation != self._generation:
+            return
+        self._preview_job = None
+        window = self.view.window()
+        panel = _output_panel(window, PREVIEW_PANEL)
+        panel.set_scratch(True)
+        panel.run_command('filter_pipes_apply',
+                          {'replacements': [[0, panel.size(), result]]})
+        window.run_command('show_panel', {'panel': 'output.' + PREVIEW_PANEL})
+
+
+LIVE_SETTING = 'filterpipes_live'  # view setting: region key -> filter spec
+LIVE_DELAY = 250  # ms without edits before live regions are refreshed
+_LIVE_PREFIX = 'filterpipes_live.'
+_LIVE_DIRTY = 'filterpipes_live_dirty'
+_LIVE_BUSY = 'filterpipes_live_busy'
+_live_views = {}  # view id -> _LiveState
+
+
+class _LiveState(object):
+    """Bookkeeping for the live filters of one view."""
+
+    def __init__(self, view):
+        self.size = view.size()
+        self.generation = 0  # bumped by every edit, to debounce refreshes
+        self.own_change = None  # change count after our last commit
+        self.committing = False
+        self.job = None  # _ProcessJob of a background refresh
+
+
+def _live_state(view):
+    state = _live_views.get(view.id())
+    if state is None:
+        state = _live_views[view.id()] = _LiveState(view)
+    return state
+
+
+def _merge_regions(regions):
+    """Sorts regions, merging any that overlap or touch."""
+    merged = []
+    for region in sorted(regions, key=lambda r: r.begin()):
+        if merged and region.begin() <= merged[-1].end():
+            if region.end() > merged[-1].end():
+                merged[-1] = sublime.Region(merged[-1].begin(), region.end())
+        else:
+            merged.append(sublime.Region(region.begin(), region.end()))
+    return merged
+
+
+def _mark_dirty(view, regions):
+    # tracked by Sublime, so later edits move them along with the text
+    view.add_regions(_LIVE_DIRTY, view.get_regions(_LIVE_DIRTY) + regions,
+                     '', '', sublime.HIDDEN)
+
+
+def _schedule_live_refresh(view, state):
+    state.generation += 1
+    generation = state.generation
+    delay = int(view.settings().get('filterpipes_live_delay', LIVE_DELAY))
+    sublime.set_timeout(lambda: _live_refresh_due(view, generation), delay)
+
+
+def _live_refresh_due(view, generation):
+    state = _live_views.get(view.id())
+    if state is not None and state.generation == generation:
+        view.run_command('filter_pipes_live_refresh')
+
+
+def _live_filter(work, texts=None):
+    """Runs each filter in work, a list of (command instance, regions).
+
+    Returns:
+      (replacements, regions of the filters that failed, the status
+      message of the first failure or None).
+    """
+    replacements, failed, message = [], [], None
+    for n, (instance, regions) in enumerate(work):
+        instance.success = False
+        replacements.extend(instance._get_replacements(
+            regions, texts[n] if texts is not None else None))
+        if not instance.success:
+            failed.extend(regions)
+            if message is None:
+                message = instance.failure_message()
+    return replacements, failed, message
+
+
+def _live_targets(live, dirty, line_local):
+    """The parts of live regions to filter again for the dirty regions.
+
+    Line-local filters get just the dirty lines within each live region;
+    other filters get every live region that a dirty region touches.
+    """
+    targets = []
+    for region in live:
+        for touched in dirty:
+            begin = max(region.begin(), touched.begin())
+            end = min(region.end(), touched.end())
+            if begin > end or (begin == end and line_local):
+                continue
+            if not line_local:
+                targets.append(region)
+                break
+            targets.append(sublime.Region(begin, end))
+    return _merge_regions(targets) if line_local else targets
+
+
+class FilterPipesLiveAttachCommand(sublime_plugin.TextCommand):
+    """Keeps the selections (or the whole file) filtered as they're edited.
+
+    "command" names a FilterPipes filter command and "args" its settings.
+    The regions are filtered right away and then tracked with add_regions.
+    Once editing pauses for filterpipes_live_delay milliseconds (a view
+    setting), only the lines touched since the last refresh are filtered
+    again if the filter is line_local, or otherwise only the live regions
+    that contain them. Process filters run in the background; if the
+    buffer changes meanwhile, their output is discarded and the lines stay
+    dirty. If a filter fails, the failure is shown in the status bar and
+    its lines stay dirty until the next edit. Because touched lines are
+    filtered again whole, the filter should leave already-filtered text
+    as it is.
+    """
+
+    def run(self, edit, command, args=None):
+        view = self.view
+        cls = find_command_class(command)
+        if cls is None:
+            sublime.status_message(
+                'FilterPipes: unknown filter command: %s' % command)
+            return
+        regions = [r for r in view.sel() if not r.empty()]
+        if not regions:
+            regions = [sublime.Region(0, view.size())]
+        specs = view.settings().get(LIVE_SETTING) or {}
+        for key in specs:
+            if any(live.intersects(r) for live in view.get_regions(key)
+                   for r in regions):
+                sublime.status_message(
+                    'FilterPipes: already live filtered; stop that first')
+                return
+        n = 1
+        while '%s%d' % (_LIVE_PREFIX, n) in specs:
+            n += 1
+        key = '%s%d' % (_LIVE_PREFIX, n)
+        view.add_regions(key, regions, '', '',
+                         sublime.HIDDEN | sublime.PERSISTENT)
+        specs[key] = {'command': command, 'args': args or {}}
+        view.settings().set(LIVE_SETTING, specs)
+        _live_state(view).size = view.size()
+        _mark_dirty(view, regions)
+        view.run_command('filter_pipes_live_refresh')
+
+
+class FilterPipesLiveDetachCommand(sublime_plugin.TextCommand):
+    """Stops the live filters with a region under a cursor, or all of them."""
+
+    def run(self, edit, all=False):
+        view = self.view
+        specs = view.settings().get(LIVE_SETTING) or {}
+        points = [r.begin() for r in view.sel()]
+        for key in list(specs):
+            if all or any(live.contains(p) for live in view.get_regions(key)
+                          for p in points):
+                view.erase_regions(key)
+                del specs[key]
+        if specs:
+            view.settings().set(LIVE_SETTING, specs)
+            return
+        view.settings().erase(LIVE_SETTING)
+        view.erase_regions(_LIVE_DIRTY)
+        state = _live_views.pop(view.id(), None)
+        if state is not None and state.job is not None:
+            state.job.stop('cancelled')
+
+    def is_enabled(self, all=False):
+        return bool(self.view.settings().get(LIVE_SETTING))
+
+
+class FilterPipesLiveRefreshCommand(sublime_plugin.TextCommand):
+    """Filters the dirty parts of the view's live regions.
+
+    Run by FilterPipesLiveListener once editing pauses, and again with
+    the "replacements" a background refresh computed at "change_count",
+    the regions of any filters that "failed" and their "message".
+    """
+
+    def run(self, edit, replacements=None, change_count=None, failed=None,
+            message=None):
+        view = self.view
+        state = _live_state(view)
+        if replacements is not None:
+            self._finish(edit, state, replacements, change_count, failed,
+                         message)
+            return
+        if state.job is not None:
+            return  # _finish refreshes again if anything changed meanwhile
+        dirty = _merge_regions(view.get_regions(_LIVE_DIRTY))
+        work = []  # (command instance, regions to filter)
+        try:
+            for key, spec in sorted((view.settings().get(LIVE_SETTING) or
+                                     {}).items()):
+                cls = find_command_class(spec['command'])
+                if cls is None or not dirty:
+                    continue
+                instance = cls(view)
+                instance.apply_settings(spec.get('args') or {})
+                instance.post_init()
+                regions = _live_targets(view.get_regions(key), dirty,
+                                        instance.line_local)
+                if regions:
+                    work.append((instance, regions))
+            if not any(isinstance(i, FilterPipesProcessCommand)
+                       for i, _ in work):
+                replacements, failed, message = _live_filter(work)
+                view.erase_regions(_LIVE_DIRTY)
+                self._commit(edit, state, replacements, failed, message)
+                return
+        except Exception as ex:
+            # the dirty regions stay, to be tried again after the next edit
+            sublime.status_message(str(ex))
+            return
+        view.erase_regions(_LIVE_DIRTY)
+        job = state.job = _ProcessJob('live filters')
+        timeouts = [float(i.timeout) for i, _ in work
+                    if getattr(i, 'timeout', None)]
+        if timeouts:
+            job.start_timeout(min(timeouts))
+        texts = []
+        for instance, regions in work:
+            instance._job = job
+            texts.append([view.substr(r) for r in regions])
+        view.add_regions(_LIVE_BUSY, [r for _, rs in work for r in rs],
+                         '', '', sublime.HIDDEN)
+        worker = threading.Thread(target=self._run_async,
+                                  args=(job, work, texts, view.change_count()))
+        worker.daemon = True
+        worker.start()
+
+    def _run_async(self, job, work, texts, change_count):
+        replacements, failed, message = [], [], None
+        try:
+            replacements, failed, message = _live_filter(work, texts)
+        except Exception as ex:
+            replacements = []
+            failed = [r for _, regions in work for r in regions]
+            message = str(ex)
+        finally:
+            job.finish()
+            args = {
+                'replacements': [[r.a, r.b, text] for r, text in replacements],
+                'change_count': change_count,
+                'failed': [[r.a, r.b] for r in failed],
+                'message': message,
+            }
+            sublime.set_timeout(lambda: self.view.run_command(
+                'filter_pipes_live_refresh', args), 0)
+
+    def _finish(self, edit, state, replacements, change_count, failed,
+                message):
+        view = self.view
+        state.job = None
+        busy = view.get_regions(_LIVE_BUSY)
+        view.erase_regions(_LIVE_BUSY)
+        if view.change_count() != change_count:
+            # the results no longer line up with the text; try again
+            _mark_dirty(view, busy)
+            _schedule_live_refresh(view, state)
+            return
+        self._commit(edit, state,
+                     [(sublime.Region(a, b), text)
+                      for a, b, text in replacements],
+                     [sublime.Region(a, b) for a, b in failed or []],
+                     message)
+
+    def _commit(self, edit, state, replacements, failed, message):
+        # failed regions are marked before the edits so that they move
+        # along with them, and are tried again after the next edit
+        if failed:
+            _mark_dirty(self.view, failed)
+        if message:
+            sublime.status_message(message)
+        if not replacements:
+            return
+        state.committing = True
+        try:
+            for region, text in sorted(replacements, reverse=True,
+                                       key=lambda r: r[0].begin()):
+                self.view.replace(edit, region, text)
+        finally:
+            state.committing = False
+        state.own_change = self.view.change_count()
+        state.size = self.view.size()
+
+
+class FilterPipesLiveListener(sublime_plugin.EventListener):
+    """Marks the lines each edit touches in views with live filters."""
+
+    def on_modified(self, view):
+        if not view.settings().get(LIVE_SETTING):
+            return
+        state = _live_state(view)
+        size = view.size()
+        grown = max(size - state.size, 0)
+        state.size = size
+        if state.committing or view.change_count() == state.own_change:
+            return
+        # Sublime doesn't say what changed, but an edit ends at a cursor,
+        # and whatever it inserted before one is at most "grown" long.
+        _mark_dirty(view, [
+            view.full_line(sublime.Region(max(r.begin() - grown, 0), r.end()))
+            for r in view.sel()])
+        _schedule_live_refresh(view, state)
+
+    def on_close(self, view):
+        state = _live_views.pop(view.id(), None)
+        if state is not None and state.job is not None:
+            state.job.stop('cancelled')
+
+
+def plugin_unloaded():
+    for job in list(_running_jobs.values()):
+        job.stop('cancelled')
+    for state in list(_live_views.values()):
+        if state.job is not None:
+            state.job.stop('cancelled')
+    shutdown_servers()
@@ -27,43 +27,55 @@ github.com/tylerl/FilterPipes
 import sys
 if sys.version_info[0] == 3:  # Python 3; ST 3
     from FilterPipes import filterpipes  # ST3-style import
-    from urllib.parse import quote, unquote
+    _ENGINES = 'FilterPipes.filterengines.'
+    _URLLIB = 'urllib.parse'
 else:
     import filterpipes  # ST2-style import
-    from urllib import quote, unquote
+    _ENGINES = 'filterengines.'
+    _URLLIB = 'urllib'
 
-import base64
+import os
+import sublime
+
+# Imported on first use, so loading the plugin only defines the commands.
+urllib = filterpipes.LazyModule(_URLLIB)
+b64 = filterpipes.LazyModule(_ENGINES + 'b64')
+casing = filterpipes.LazyModule(_ENGINES + 'casing')
+lines = filterpipes.LazyModule(_ENGINES + 'lines')
+literals = filterpipes.LazyModule(_ENGINES + 'literals')
+multiregex = filterpipes.LazyModule(_ENGINES + 'multiregex')
+radix = filterpipes.LazyModule(_ENGINES + 'radix')
 
 
 class FilterPipesBase64Command(filterpipes.FilterPipesCommandBase):
+    """Encodes text as Base64, or decodes it.
+
+    Text is encoded as UTF-8 and wrapped at "wrap" characters per line
+    (0 for a single line). "urlsafe" uses the URL and filename safe
+    alphabet, and "padding": false leaves off the trailing "=" signs.
+    Decoding accepts either alphabet, with or without padding, and
+    ignores whitespace.
+    """
     decode = False
     wrap = 64
     urlsafe = False
+    padding = True
 
     def filter(self, text):
-        b64e = base64.base64encode
-        b64d = base64.base64decode
-        if self.urlsafe:
-            b64e = base64.urlsafe_base64encode
-            b64d = base64.urlsafe_base64decode
         if self.decode:
-            return b64d(text.encode('UTF-8')).decode('UTF-8')
-        encoded = b64e(text.encode('UTF-8')).decode('UTF-8')
-        if self.wrap:
-            return '\n'.join(
-                (encoded[i:i + self.wrap] for i in
-                    range(0, len(encoded), self.wrap)))
-        return encoded
+            return b64.decode(text)
+        return b64.encode(text, self.wrap, self.urlsafe, self.padding)
 
 
 class FilterPipesUrlencodeCommand(filterpipes.FilterPipesCommandBase):
     decode = False
+    line_local = True
 
     def filter(self, text):
         if self.decode:
-            return unquote(text)
+            return urllib.unquote(text)
         else:
-            return quote(text)
+            return urllib.quote(text)
 
 
 class FilterPipesEscapeCommand(filterpipes.FilterPipesCommandBase):
@@ -76,41 +88,191 @@ class FilterPipesEscapeCommand(filterpipes.FilterPipesCommandBase):
             return data.encode('unicode-escape').decode("UTF-8")
 
 
+class FilterPipesCaseCommand(filterpipes.FilterPipesCommandBase):
+    """Converts identifiers between naming conventions.
+
+    The case setting is one of "camel" (CamelCase), "mixed" (mixedCase),
+    "snake" (snake_case), "kebab" (kebab-case) or "constant"
+    (CONSTANT_CASE), using the same rules as the case filters in the
+    custom plugin template.
+    """
+    case = 'snake'
+    line_local = True
+
+    def filter(self, data):
+        return casing.convert(data, self.case)
+
+
+_rule_sets = filterpipes.LRUCache(32)
+
+
+class FilterPipesRegexMultiCommand(filterpipes.FilterPipesCommandBase):
+    """Applies an ordered list of regex replacements in as few passes as
+    possible.
+
+    Each entry in rules is [regex, replacement] or [regex, replacement,
+    flags]. The result is the same as running filter_pipes_regex once per
+    rule, but rules that can't affect one another are scanned for
+    together (see filterengines/multiregex.py). Set fuse to false to
+    always apply them one at a time. Compiled rule sets are cached
+    between runs.
+    """
+    rules = None
+    fuse = True
+    _rule_set = None
+
+    def post_init(self):
+        self._rule_set = None
+        if self.rules:
+            key = (tuple(tuple(rule) for rule in self.rules),
+                   bool(self.fuse))
+            self._rule_set = _rule_sets.get(key)
+            if self._rule_set is None:
+                self._rule_set = multiregex.RuleSet(self.rules, self.fuse)
+                _rule_sets.put(key, self._rule_set)
+
+    def filter(self, data):
+        if self._rule_set is None:
+            return None
+        return self._rule_set.sub(data)
+
+
+_literal_replacers = filterpipes.LRUCache(8)
+
+
+class FilterPipesReplaceLiteralsCommand(filterpipes.FilterPipesCommandBase):
+    """Replaces any number of literal strings in a single pass.
+
+    Pairs come from "replacements" (an object mapping each string to its
+    replacement, or a list of [string, replacement] pairs) and/or from
+    "replacements_file": a .json file holding the same, or a file of
+    tab-separated lines. Relative paths are taken from the Packages
+    directory. Where strings overlap, the leftmost match wins, then the
+    longest. The compiled matcher for a file is reused until the file's
+    modification time or size changes.
+    """
+    replacements = None
+    replacements_file = None
+    _replacer = None
+    _file_key = ()
+
+    def post_init(self):
+        path = None
+        self._file_key = ()
+        if self.replacements_file:
+            path = os.path.join(sublime.packages_path(),
+                                os.path.expanduser(self.replacements_file))
+            stat = os.stat(path)
+            self._file_key = ((path, stat.st_mtime, stat.st_size),)
+        key = self._file_key
+        inline = self.replacements or ()
+        if isinstance(inline, dict):
+            inline = sorted(inline.items())
+        inline = tuple(tuple(pair) for pair in inline)
+        key += (inline,)
+        self._replacer = _literal_replacers.get(key)
+        if self._replacer is None:
+            pairs = literals.load_pairs(path) if path else []
+            self._replacer = literals.LiteralReplacer(
+                list(pairs) + list(inline))
+            _literal_replacers.put(key, self._replacer)
+
+    def cache_state(self):
+        return self._file_key
+
+    def filter(self, data):
+        if not self._replacer.mapping:
+            return None
+        return self._replacer.sub(data)
+
+
+class FilterPipesLinesCommand(filterpipes.FilterPipesCommandBase):
+    """Sorts, de-duplicates, reverses or cuts lines without a subprocess.
+
+    The operation setting picks what to do:
+      "sort": like sort(1); "key" is "text", "numeric", "natural" or
+        "locale", plus "reverse", "unique" and "ignore_case". Selections
+        larger than about a quarter of "ram_budget" bytes are sorted in
+        runs through temporary files.
+      "uniq": like uniq(1); "count" prefixes each line with its count,
+        "ignore_case" compares lowercased lines.
+      "tac": reverses the order of the lines.
+      "cut": like cut -f; "fields" is a list such as "1,3-5" and
+        "delimiter" defaults to a tab.
+    """
+    operation = 'sort'
+    key = 'text'
+    reverse = False
+    unique = False
+    ignore_case = False
+    count = False
+    fields = None
+    delimiter = '\t'
+    ram_budget = 256 * 1024 * 1024
+
+    def filter(self, data):
+        if self.operation == 'sort':
+            return lines.sort_lines(data, self.key, self.reverse, self.unique,
+                                    self.ignore_case, self.ram_budget)
+        elif self.operation == 'uniq':
+            return lines.uniq_lines(data, self.count, self.ignore_case)
+        elif self.operation == 'tac':
+            return lines.reverse_lines(data)
+        elif self.operation == 'cut':
+            return lines.cut_lines(data, self.fields, self.delimiter)
+        raise ValueError('unknown line operation "%s" (expected sort, uniq, '
+                         'tac or cut)' % self.operation)
+
+
 class FilterPipesIntToIntCommand(filterpipes.FilterPipesRegexCommand):
-    """Converts integer strings between common bases.
+    """Converts integer strings between bases 2, 8, 10 and 16.
+
+    Output is zero-padded to at least "width" digits. "columns" limits
+    conversion to those (1-based) fields of each line, split on
+    "delimiter" or, by default, on runs of blanks.
 
-    Included as a demonstration of more complex uses of regex matching,
-    including configuration using the post_init callback as well as
-    replacement using a function instead of static text.
+    Numbers are converted in bulk by filterengines/radix.py. With
+    "bulk": false, the original demonstration of more complex regex
+    matching is used instead: configuration in the post_init callback
+    and replacement by a function called for each match. Only that path
+    honors "time_budget", and "columns" always converts in bulk, even
+    with "bulk": false.
     """
-    BASE_REGEX = {
-        10: r"\b([0-9]+)\b",
-        16: r"\b((?:0[Xx])?[0-9a-fA-F]+)\b",
-        8: r"\b([0-7]+)\b"
-    }
-    BASE_FMT = {8: "%o", 10: "%i", 16: "%x"}
-    PREFIX = {8: "0", 10: "", 16: "0x"}
     regex = None  # set by post_init
     from_base = 10
     to_base = 16
     case = "lower"
     output_prefix = True
+    width = 0
+    columns = None
+    delimiter = None
+    bulk = True
 
     def post_init(self):
         self.from_base = int(self.from_base)
         self.to_base = int(self.to_base)
-        self.regex = self.BASE_REGEX[self.from_base]
-        self.output_fmt = self.BASE_FMT[self.to_base]
-        if self.output_prefix:
-            self.output_fmt = self.PREFIX[self.to_base] + self.output_fmt
-        if self.case == "upper":
-            self.output_fmt = self.output_fmt.upper()
+        self.regex = radix.PATTERNS.get(self.from_base)
+        if self.regex is None:
+            raise ValueError('FilterPipes: unsupported base: %s' %
+                             self.from_base)
+        self.output_fmt = radix.formatter(
+            self.to_base, self.width, self.case == "upper",
+            self.output_prefix)
+        super(FilterPipesIntToIntCommand, self).post_init()
+
+    def filter(self, data):
+        if not self.bulk and not self.columns:
+            return super(FilterPipesIntToIntCommand, self).filter(data)
+        return radix.convert(
+            data, self.from_base, self.to_base, self.width,
+            self.case == "upper", self.output_prefix, self.columns,
+            self.delimiter)
 
     def replacement(self, match):
         txt = match.group(1)
         try:
           val = int(txt, self.from_base)
-          return self.output_fmt % (val)
+          return self.output_fmt(val)
         except ValueError:
             pass
         return match.group(0)
@@ -0,0 +1,86 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Live filters run headless against tools/sublime_stub.py.
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'tools'))
+import sublime_stub as S
+
+fp, filters = S.load()
+
+
+def wait_for_refresh(view):
+    """Runs the UI callbacks until the view's background refresh is done."""
+    state = fp._live_views[view.id()]
+    deadline = time.time() + 10
+    while state.job is not None or S._pending:
+        if time.time() > deadline:
+            raise AssertionError('live refresh did not finish')
+        S.run_pending()
+        time.sleep(0.01)
+
+
+class LiveFailureTest(unittest.TestCase):
+
+    def setUp(self):
+        del S.status_messages[:]
+
+    def attach(self, text, command, args):
+        view = S.View(text)
+        view.sel().add(S.Region(0, view.size()))
+        view.run_command('filter_pipes_live_attach',
+                         {'command': command, 'args': args})
+        return view
+
+    def test_failing_process_filter_stays_dirty(self):
+        view = self.attach('x\ny\n', 'filter_pipes_process',
+                           {'command': ['false']})
+        wait_for_refresh(view)
+        self.assertEqual(view.text(), 'x\ny\n')
+        self.assertEqual(view.get_regions(fp._LIVE_DIRTY),
+                         [S.Region(0, 4)])
+        self.assertTrue(S.status_messages)
+        self.assertIn('false', S.status_messages[-1])
+
+    def test_failing_sync_filter_stays_dirty(self):
+        view = self.attach('12\n', 'filter_pipes_int_to_int',
+                           {'from_base': 7})
+        self.assertEqual(view.text(), '12\n')
+        self.assertEqual(view.get_regions(fp._LIVE_DIRTY),
+                         [S.Region(0, 3)])
+        self.assertIn('unsupported base', S.status_messages[-1])
+
+    def test_successful_filter_clears_dirty(self):
+        view = self.attach('x\ny\n', 'filter_pipes_process',
+                           {'command': ['tr', 'a-z', 'A-Z']})
+        wait_for_refresh(view)
+        self.assertEqual(view.text(), 'X\nY\n')
+        self.assertEqual(view.get_regions(fp._LIVE_DIRTY), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Headless benchmarks for the FilterPipes commands.
+
+Runs the built-in commands against the stand-in sublime module across a
+range of document sizes and selection counts, and reports throughput,
+latency percentiles and peak Python memory. Results can be saved as JSON
+and compared against an earlier run:
+
+    python3 tools/bench.py --sizes 1K,1M --selections 1,1000 -o new.json
+    python3 tools/bench.py --compare old.json new.json
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import sublime_stub
+
+# name -> (command, args[, name of the function building its document])
+CASES = {
+    'regex': ('filter_pipes_regex',
+              {'regex': '[\t ]+$', 'replacement': '', 'lines': True}),
+    'translate': ('filter_pipes_translate',
+                  {'before': '\'"', 'after': '"\''}),
+    'curly_quotes': ('filter_pipes_translate',
+                     {'before': u'\u2018\u2019\u201c\u201d',
+                      'after': '\'\'""'}, 'make_typeset_document'),
+    'base64': ('filter_pipes_base64', {'decode': False, 'wrap': 64}),
+    'base64_decode': ('filter_pipes_base64', {'decode': True},
+                      'make_base64_document'),
+    'urlencode': ('filter_pipes_urlencode', {'decode': False}),
+    'escape': ('filter_pipes_escape', {'decode': False}),
+    'int_to_int': ('filter_pipes_int_to_int',
+                   {'from_base': 10, 'to_base': 16}),
+    'int_to_int_match': ('filter_pipes_int_to_int',
+                         {'from_base': 10, 'to_base': 16, 'bulk': False}),
+    'hexdump': ('filter_pipes_int_to_int',
+                {'from_base': 16, 'to_base': 2, 'width': 8,
+                 'output_prefix': False}, 'make_hexdump_document'),
+    'hexdump_match': ('filter_pipes_int_to_int',
+                      {'from_base': 16, 'to_base': 2, 'width': 8,
+                       'output_prefix': False, 'bulk': False},
+                      'make_hexdump_document'),
+    'csv_column': ('filter_pipes_int_to_int',
+                   {'from_base': 10, 'to_base': 16, 'columns': [2],
+                    'delimiter': ','}, 'make_csv_document'),
+    'process': ('filter_pipes_process', {'command': ['cat']}),
+    'spawn_shell': ('filter_pipes_process',
+                    {'command': 'cat', 'shell': True}),
+    'spawn_fast': ('filter_pipes_process',
+                   {'command': 'cat', 'shell': True, 'fast_spawn': True}),
+    'regex_multi': ('filter_pipes_regex_multi', {'rules': [
+        ['alpha', 'ALPHA'], ['kappa', 'KAPPA'], ['\t', '    '],
+        ['"', "'"], ['[0-9]+', '#'], ['[\t ]+$', '', 8]]}),
+    'literals': ('filter_pipes_replace_literals', {'replacements': {
+        'alpha': 'ALPHA', 'beta': 'BETA', 'zeta_eta': 'zeta-eta',
+        'eta': 'ETA', 'ThetaIota': 'theta_iota', '65535': '0xffff'}}),
+    'sort_lines': ('filter_pipes_lines', {'operation': 'sort'}),
+    'sort_natural': ('filter_pipes_lines',
+                     {'operation': 'sort', 'key': 'natural'}),
+    'sort_process': ('filter_pipes_process', {'command': ['sort']}),
+    'camel_case': ('filter_pipes_case', {'case': 'camel'}),
+    'snake_case': ('filter_pipes_case', {'case': 'snake'}),
+}
+
+WORDS = ('alpha', 'beta', "gamma's", '"delta"', 'epsilon', '12345', '0',
+         'zeta_eta', 'ThetaIota', '65535', 'kappa\t', 'lambda  ')
+
+
+def parse_size(text):
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def make_document(size, seed=0):
+    """Builds roughly size characters of word-like lines."""
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    while total < size:
+        line = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        lines.append(line)
+        total += len(line) + 1
+    return ('\n'.join(lines) + '\n')[:size]
+
+
+def make_base64_document(size, count):
+    """Base64 text in which each of make_selections' regions decodes."""
+    encoded = base64.b64encode(make_document(size).encode()).decode()
+    step = size // count
+    parts = []
+    for i in range(count):
+        begin = i * step - i * step % 4  # start on a whole group
+        part = encoded[begin:begin + step - 1]
+        if len(part) % 4 == 1:
+            part = part[:-1] + '\n'  # can't end with a lone character
+        parts.append(part + '\n')
+    return ''.join(parts).ljust(size, '\n')
+
+
+def make_typeset_document(size, count):
+    """make_document with curly quotes and accented words mixed in."""
+    text = make_document(size)
+    for plain, fancy in (("'s", u'\u2019s'), ('"delta"', u'\u201cdelta\u201d'),
+                         ('beta', u'b\xeata')):
+        text = text.replace(plain, fancy)
+    return text
+
+
+def make_hexdump_document(size, count):
+    """Lines of 16 hex bytes, like the output of xxd or hexdump -C."""
+    rng = random.Random(0)
+    lines = []
+    total = 0
+    while total < size:
+        line = ' '.join('%02x' % rng.randrange(256) for _ in range(16))
+        lines.append(line)
+        total += len(line) + 1
+    return ('\n'.join(lines) + '\n')[:size]
+
+
+def make_csv_document(size, count):
+    """Comma-separated rows with an integer in the second column."""
+    rng = random.Random(0)
+    lines = []
+    total = 0
+    while total < size:
+        line = '%s,%d,%d' % (rng.choice(WORDS), rng.randrange(1 << 32),
+                             rng.randrange(100))
+        lines.append(line)
+        total += len(line) + 1
+    return ('\n'.join(lines) + '\n')[:size]
+
+
+def make_selections(size, count):
+    """Splits [0, size) into count non-empty, non-adjacent regions."""
+    step = size // count
+    return [sublime_stub.Region(i * step, (i + 1) * step - 1)
+            for i in range(count)]
+
+
+def run_case(name, document, selections, repeat, measure_memory=True):
+    command, args = CASES[name][:2]
+    cls = sublime_stub.find_command(command)
+    timings = []
+    for _ in range(repeat):
+        view = sublime_stub.View(document)
+        view.sel().add_all(selections)
+        start = time.perf_counter()
+        view.run_command(command, args)
+        view.text()  # include applying the queued replacements
+        timings.append(time.perf_counter() - start)
+    peak = None
+    if measure_memory:
+        view = sublime_stub.View(document)
+        view.sel().add_all(selections)
+        tracemalloc.start()
+        cls(view).run(sublime_stub.Edit(), **args)
+        view.text()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return timings, peak
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = (len(values) - 1) * pct / 100.0
+    low = int(index)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (index - low)
+
+
+def summarize(name, size, count, timings, peak):
+    median = percentile(timings, 50)
+    return {
+        'case': name,
+        'size': size,
+        'selections': count,
+        'runs': len(timings),
+        'p50': median,
+        'p90': percentile(timings, 90),
+        'p99': percentile(timings, 99),
+        'mean': sum(timings) / len(timings),
+        'mb_per_s': size / median / 1e6 if median else None,
+        'peak_bytes': peak,
+    }
+
+
+def format_row(row):
+    if 'error' in row:
+        return '%-16s %10s %6d  ERROR: %s' % (
+            row['case'], format_size(row['size']), row['selections'],
+            row['error'])
+    peak = row['peak_bytes']
+    return '%-16s %10s %6d %10.2f %10.2f %10.2f %9.1f %10s' % (
+        row['case'], format_size(row['size']), row['selections'],
+        row['p50'] * 1e3, row['p90'] * 1e3, row['p99'] * 1e3,
+        row['mb_per_s'] or 0, format_size(peak) if peak is not None else '-')
+
+
+HEADER = '%-16s %10s %6s %10s %10s %10s %9s %10s' % (
+    'case', 'size', 'sels', 'p50 ms', 'p90 ms', 'p99 ms', 'MB/s', 'peak mem')
+
+
+def format_size(nbytes):
+    for unit in ('B', 'K', 'M'):
+        if nbytes < 1024 or unit == 'M':
+            break
+        nbytes /= 1024.0
+    return ('%d%s' if unit == 'B' else '%.1f%s') % (nbytes, unit)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=sublime_stub.ROOT,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    key = lambda r: (r['case'], r['size'], r['selections'])
+    before = dict((key(r), r) for r in old['results'] if 'error' not in r)
+    print('%-16s %10s %6s %10s %10s %8s' % (
+        'case', 'size', 'sels', 'old p50', 'new p50', 'speedup'))
+    for row in new['results']:
+        prev = before.get(key(row))
+        if prev is None or 'error' in row:
+            continue
+        print('%-16s %10s %6d %10.2f %10.2f %7.2fx' % (
+            row['case'], format_size(row['size']), row['selections'],
+            prev['p50'] * 1e3, row['p50'] * 1e3, prev['p50'] / row['p50']))
+
+
+# Measured in a fresh interpreter each time, so nothing is already imported.
+LOAD_SCRIPT = """
+import sys, time
+sys.path.insert(0, %r)
+import sublime_stub
+sublime_stub.install()
+before = set(sys.modules)
+start = time.perf_counter()
+sublime_stub.load('filterpipes', 'filters', 'customfilters')
+print(time.perf_counter() - start, len(set(sys.modules) - before))
+"""
+
+
+def load_time(repeat):
+    """Times loading the plugin modules, as SublimeText does at startup.
+
+    Returns:
+      (list of seconds, number of modules imported).
+    """
+    script = LOAD_SCRIPT % os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, '-c', script])
+        seconds, modules = out.split()
+        timings.append(float(seconds))
+    return timings, int(modules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cases', default=','.join(sorted(CASES)),
+                        help='comma-separated cases (default: all)')
+    parser.add_argument('--sizes', default='1K,100K,1M',
+                        help='comma-separated document sizes, e.g. 1K,100M')
+    parser.add_argument('--selections', default='1,100,1000',
+                        help='comma-separated selection counts')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timed runs per combination')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the (slow) peak memory measurement')
+    parser.add_argument('-o', '--output', help='save results as JSON')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two saved result files and exit')
+    parser.add_argument('--load-time', action='store_true',
+                        help='time loading the plugin (--repeat fresh '
+                        'interpreters) and exit')
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    if args.load_time:
+        timings, modules = load_time(args.repeat)
+        print('plugin load: p50 %.2f ms, min %.2f ms, %d modules imported' % (
+            percentile(timings, 50) * 1e3, min(timings) * 1e3, modules))
+        return 0
+
+    sublime_stub.load()
+    cases = [c.strip() for c in args.cases.split(',') if c.strip()]
+    for name in cases:
+        if name not in CASES:
+            parser.error('unknown case: %s' % name)
+    sizes = [parse_size(s) for s in args.sizes.split(',')]
+    counts = [int(n) for n in args.selections.split(',')]
+
+    results = []
+    print(HEADER)
+    for size in sizes:
+        document = make_document(size)
+        for count in counts:
+            if count * 2 > size:
+                continue  # not enough text for that many selections
+            selections = make_selections(size, count)
+            for name in cases:
+                text = document
+                if len(CASES[name]) > 2:
+                    text = globals()[CASES[name][2]](size, count)
+                try:
+                    timings, peak = run_case(
+                        name, text, selections, args.repeat,
+                        not args.no_memory)
+                    row = summarize(name, size, count, timings, peak)
+                except Exception as ex:
+                    row = {'case': name, 'size': size, 'selections': count,
+                           'error': '%s: %s' % (type(ex).__name__, ex)}
+                results.append(row)
+                print(format_row(row))
+                sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'revision': git_revision(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                },
+                'results': results,
+            }, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Runs FilterPipes commands over files, without SublimeText.
+
+Commands are picked from .sublime-commands files by caption or by
+command name, and run against the stand-in sublime module over each file
+(whole-file, as if nothing were selected) or over stdin. Files are
+spread across a process pool and rewritten atomically, and the time
+taken for each is reported on stderr:
+
+    python3 tools/filter_files.py -c "Strip Trailing Space" src/*.py
+    python3 tools/filter_files.py -c filter_pipes_case \\
+        --args '{"case": "kebab"}' < names.txt
+    python3 tools/filter_files.py --check -c "Strip Trailing Space" -- $(git ls-files)
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+
+import sublime_stub
+
+DEFAULT_COMMANDS = os.path.join(sublime_stub.ROOT, 'Default.sublime-commands')
+CAPTION_PREFIX = 'FilterPipes: '
+
+# Strings are matched first so comment and comma lookalikes inside them
+# are left alone.
+_COMMENTS = re.compile(r'("(?:\\.|[^"\\])*")|/\*.*?\*/|//[^\n]*', re.S)
+_TRAILING_COMMAS = re.compile(r'("(?:\\.|[^"\\])*")|,(\s*[\]}])')
+
+
+class UsageError(Exception):
+    pass
+
+
+def loads_lenient(text):
+    """Parses JSON the way SublimeText does: comments and trailing commas
+    are allowed."""
+    text = _COMMENTS.sub(lambda m: m.group(1) or '', text)
+    text = _TRAILING_COMMAS.sub(lambda m: m.group(1) or m.group(2), text)
+    return json.loads(text)
+
+
+def load_entries(paths):
+    entries = []
+    for path in paths:
+        with io.open(path, encoding='utf-8') as f:
+            entries.extend(loads_lenient(f.read()))
+    return entries
+
+
+def load_plugin(path, index):
+    """Imports a plugin module (such as your custom filters) by path."""
+    name = '%s.cli_plugin_%d' % (sublime_stub.PACKAGE, index)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def find_step(entries, name, extra_args=None):
+    """Resolves a caption or command name to (command, args).
+
+    Captions match with or without the "FilterPipes: " prefix, ignoring
+    case. A bare command name runs with no args besides extra_args.
+    """
+    wanted = name.lower()
+    for entry in entries:
+        caption = entry.get('caption', '').lower()
+        if caption in (wanted, CAPTION_PREFIX.lower() + wanted):
+            command, args = entry['command'], dict(entry.get('args') or {})
+            break
+    else:
+        command, args = name, {}
+    cls = sublime_stub.find_command(command)
+    filterpipes = sys.modules[sublime_stub.PACKAGE + '.filterpipes']
+    if cls is None:
+        raise UsageError('no command or caption matches "%s"' % name)
+    if not issubclass(cls, filterpipes.FilterPipesCommandBase):
+        raise UsageError('"%s" is not a filter command' % name)
+    args.update(extra_args or {})
+    if hasattr(cls, 'asynchronous'):
+        args['asynchronous'] = False  # nothing to keep responsive here
+    return command, args
+
+
+def apply_steps(text, steps):
+    """Runs each (command, args) over the whole of text.
+
+    Returns:
+      the filtered text.
+
+    Raises:
+      RuntimeError: if a command reports failure.
+    """
+    for command, args in steps:
+        view = sublime_stub.View(text)
+        cls = sublime_stub.find_command(command)
+        instance = cls(view)
+        del sublime_stub.status_messages[:]
+        instance.run(sublime_stub.Edit(), **args)
+        sublime_stub.run_pending()
+        if not instance.success:
+            messages = sublime_stub.status_messages
+            raise RuntimeError('%s: %s' % (
+                command, messages[0] if messages else 'failed'))
+        text = view.text()
+    return text
+
+
+def write_atomic(path, data):
+    """Replaces path's contents with data via a renamed temporary file."""
+    directory, base = os.path.split(os.path.abspath(path))
+    fd, temp = tempfile.mkstemp(prefix='.%s.' % base, dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp, os.stat(path).st_mode & 0o7777)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+_worker_steps = None
+_worker_check = False
+
+
+def _init_worker(plugins, steps, check):
+    global _worker_steps, _worker_check
+    if sublime_stub.PACKAGE + '.filterpipes' not in sys.modules:
+        sublime_stub.load()
+        for index, plugin in enumerate(plugins):
+            load_plugin(plugin, index)
+    _worker_steps = steps
+    _worker_check = check
+
+
+def process_file(path):
+    """Pool worker: filters one file.
+
+    Returns:
+      (path, status, seconds, message) where status is "changed",
+      "unchanged" or "failed".
+    """
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        # newline='' semantics: line endings go through untouched
+        text = raw.decode('utf-8')
+        filtered = apply_steps(text, _worker_steps)
+        status = 'unchanged'
+        if filtered != text:
+            status = 'changed'
+            if not _worker_check:
+                write_atomic(path, filtered.encode('utf-8'))
+        message = ''
+    except Exception as ex:
+        status, message = 'failed', '%s: %s' % (type(ex).__name__, ex)
+    return path, status, time.perf_counter() - start, message
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('files', nargs='*',
+                        help='files to filter in place (default: stdin to '
+                        'stdout)')
+    parser.add_argument('-c', '--command', action='append', required=True,
+                        help='caption or command name to run; repeat to '
+                        'run several in order')
+    parser.add_argument('--args', type=json.loads,
+                        help='JSON object of extra args for the command '
+                        '(only with a single --command)')
+    parser.add_argument('--commands', action='append', metavar='FILE',
+                        help='.sublime-commands file(s) to search (default: '
+                        'the package\'s own)')
+    parser.add_argument('--plugin', action='append', default=[],
+                        metavar='FILE',
+                        help='extra plugin module to load, e.g. your custom '
+                        'filters')
+    parser.add_argument('--check', action='store_true',
+                        help='only report files that would change; exit 1 '
+                        'if any would')
+    parser.add_argument('-j', '--jobs', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='no per-file output')
+    args = parser.parse_args(argv)
+    if args.args is not None and len(args.command) > 1:
+        parser.error('--args needs a single --command')
+
+    sublime_stub.load()
+    for index, plugin in enumerate(args.plugin):
+        load_plugin(plugin, index)
+    try:
+        entries = load_entries(args.commands or [DEFAULT_COMMANDS])
+        steps = [find_step(entries, name, args.args)
+                 for name in args.command]
+    except (UsageError, ValueError, IOError) as ex:
+        parser.error(str(ex))
+
+    if not args.files or args.files == ['-']:
+        try:
+            # bytes, like the files: line endings go through untouched
+            text = sys.stdin.buffer.read().decode('utf-8')
+            filtered = apply_steps(text, steps)
+            sys.stdout.buffer.write(filtered.encode('utf-8'))
+        except Exception as ex:
+            sys.stderr.write('%s\n' % ex)
+            return 2
+        return 0
+
+    start = time.perf_counter()
+    initargs = (args.plugin, steps, args.check)
+    if args.jobs > 1 and len(args.files) > 1:
+        pool = multiprocessing.Pool(args.jobs, _init_worker, initargs)
+        results = pool.imap_unordered(process_file, args.files)
+    else:
+        pool = None
+        _init_worker(*initargs)
+        results = (process_file(path) for path in args.files)
+    counts = {'changed': 0, 'unchanged': 0, 'failed': 0}
+    try:
+        for path, status, seconds, message in results:
+            counts[status] += 1
+            if status == 'failed' or not args.quiet:
+                sys.stderr.write('%9.2f ms  %-9s %s%s\n' % (
+                    seconds * 1e3, status, path,
+                    '  (%s)' % message if message else ''))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if not args.quiet:
+        sys.stderr.write('%d files: %d changed, %d unchanged, %d failed '
+                         'in %.2fs\n' % (
+                             len(args.files), counts['changed'],
+                             counts['unchanged'], counts['failed'],
+                             time.perf_counter() - start))
+    if counts['failed']:
+        return 2
+    if args.check and counts['changed']:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
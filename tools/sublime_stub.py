@@ -0,0 +1,337 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This is not an official Google product.
+
+"""Stand-in sublime and sublime_plugin modules for running headless.
+
+Provides just enough of the SublimeText API (Region, selections, a
+text-only View) to load the FilterPipes modules outside the editor and
+run their commands, for benchmarking and batch use.
+
+Part of the FilterPipes SublimeText Plugin.
+github.com/tylerl/FilterPipes
+
+"""
+
+import importlib
+import os
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = 'FilterPipes'
+
+status_messages = []
+PERSISTENT = 16
+HIDDEN = 128
+_pending = []
+
+
+class Region(object):
+    def __init__(self, a, b=None):
+        if b is None:
+            b = a
+        self.a = a
+        self.b = b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def size(self):
+        return abs(self.b - self.a)
+
+    def empty(self):
+        return self.a == self.b
+
+    def contains(self, x):
+        if isinstance(x, Region):
+            return self.begin() <= x.begin() and x.end() <= self.end()
+        return self.begin() <= x <= self.end()
+
+    def intersects(self, other):
+        return (self.begin() < other.end() and other.begin() < self.end())
+
+    def __len__(self):
+        return self.size()
+
+    def __eq__(self, other):
+        return (isinstance(other, Region) and
+                (self.a, self.b) == (other.a, other.b))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '(%d, %d)' % (self.a, self.b)
+
+
+class Selection(object):
+    def __init__(self):
+        self._regions = []
+
+    def add(self, region):
+        self._regions.append(region)
+        self._regions.sort(key=Region.begin)
+
+    def add_all(self, regions):
+        for region in regions:
+            self.add(region)
+
+    def clear(self):
+        del self._regions[:]
+
+    def __iter__(self):
+        return iter(list(self._regions))
+
+    def __len__(self):
+        return len(self._regions)
+
+    def __getitem__(self, index):
+        return self._regions[index]
+
+
+class Settings(object):
+    def __init__(self):
+        self._values = {}
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def set(self, key, value):
+        self._values[key] = value
+
+    def has(self, key):
+        return key in self._values
+
+    def erase(self, key):
+        self._values.pop(key, None)
+
+
+class View(object):
+    """A text buffer with selections, but no window or rendering.
+
+    Replacements arriving in descending order (which is how FilterPipes
+    commits them) are queued and applied in one pass on the next read,
+    so thousands of edits to a large buffer don't each copy the text.
+    """
+    _next_id = 1
+
+    def __init__(self, text='', encoding='UTF-8'):
+        self._text = text
+        self._edits = []  # pending (begin, end, text), descending
+        self._sel = Selection()
+        self._regions = {}
+        self._status = {}
+        self._settings = Settings()
+        self._encoding = encoding
+        self._change_count = 0
+        self._id = View._next_id
+        View._next_id += 1
+
+    def _flush(self):
+        if not self._edits:
+            return
+        parts = []
+        pos = len(self._text)
+        for begin, end, text in self._edits:
+            parts.append(self._text[end:pos])
+            parts.append(text)
+            pos = begin
+        parts.append(self._text[:pos])
+        parts.reverse()
+        self._text = ''.join(parts)
+        self._edits = []
+
+    def text(self):
+        self._flush()
+        return self._text
+
+    def id(self):
+        return self._id
+
+    def size(self):
+        self._flush()
+        return len(self._text)
+
+    def substr(self, x):
+        self._flush()
+        if isinstance(x, Region):
+            return self._text[x.begin():x.end()]
+        return self._text[x:x + 1]
+
+    def full_line(self, x):
+        """The lines spanned by x, including their newlines."""
+        self._flush()
+        if not isinstance(x, Region):
+            x = Region(x)
+        begin = self._text.rfind('\n', 0, x.begin()) + 1
+        end = self._text.find('\n', x.end())
+        return Region(begin, len(self._text) if end < 0 else end + 1)
+
+    def replace(self, edit, region, text):
+        begin, end = region.begin(), region.end()
+        if self._edits and end > self._edits[-1][0]:
+            self._flush()
+        self._edits.append((begin, end, text))
+        self._change_count += 1
+
+    def insert(self, edit, point, text):
+        self.replace(edit, Region(point), text)
+        return len(text)
+
+    def erase(self, edit, region):
+        self.replace(edit, region, '')
+
+    def change_count(self):
+        return self._change_count
+
+    def sel(self):
+        return self._sel
+
+    def encoding(self):
+        return self._encoding
+
+    def settings(self):
+        return self._settings
+
+    def window(self):
+        return None
+
+    def set_scratch(self, scratch):
+        self._scratch = scratch
+
+    def file_name(self):
+        return None
+
+    def set_status(self, key, value):
+        self._status[key] = value
+
+    def erase_status(self, key):
+        self._status.pop(key, None)
+
+    def add_regions(self, key, regions, *args, **kwargs):
+        self._regions[key] = list(regions)
+
+    def get_regions(self, key):
+        return list(self._regions.get(key, ()))
+
+    def erase_regions(self, key):
+        self._regions.pop(key, None)
+
+    def run_command(self, name, args=None):
+        cls = find_command(name)
+        if cls is None:
+            raise KeyError('no such command: %s' % name)
+        cls(self).run(Edit(), **(args or {}))
+
+
+class Edit(object):
+    pass
+
+
+def status_message(msg):
+    status_messages.append(msg)
+
+
+def set_timeout(callback, delay=0):
+    _pending.append(callback)
+
+
+set_timeout_async = set_timeout
+
+
+def run_pending():
+    """Runs callbacks queued with set_timeout, including newly queued ones."""
+    while _pending:
+        _pending.pop(0)()
+
+
+def packages_path():
+    return os.path.dirname(ROOT)
+
+
+def cache_path():
+    return os.path.join(tempfile.gettempdir(), 'FilterPipes-headless-cache')
+
+
+def version():
+    return '3000'
+
+
+def platform():
+    return sys.platform
+
+
+def find_command(name):
+    """Finds a loaded command class by its Sublime command name."""
+    filterpipes = sys.modules.get(PACKAGE + '.filterpipes')
+    pending = [TextCommand, WindowCommand]
+    found = None
+    while pending:
+        cls = pending.pop()
+        if filterpipes.command_name(cls) == name:
+            found = cls
+        pending.extend(cls.__subclasses__())
+    return found
+
+
+class TextCommand(object):
+    def __init__(self, view):
+        self.view = view
+
+
+class WindowCommand(object):
+    def __init__(self, window):
+        self.window = window
+
+
+class ApplicationCommand(object):
+    pass
+
+
+class EventListener(object):
+    pass
+
+
+def install():
+    """Registers the stand-in modules as sublime and sublime_plugin."""
+    if 'sublime' in sys.modules:
+        return
+    this = sys.modules[__name__]
+    plugin = types.ModuleType('sublime_plugin')
+    for name in ('TextCommand', 'WindowCommand', 'ApplicationCommand',
+                 'EventListener'):
+        setattr(plugin, name, getattr(this, name))
+    sys.modules['sublime'] = this
+    sys.modules['sublime_plugin'] = plugin
+
+
+def load(*modules):
+    """Loads FilterPipes modules (default: filterpipes and filters).
+
+    Returns:
+      list of the loaded module objects, in the order requested.
+    """
+    install()
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE] = package
+    return [importlib.import_module('%s.%s' % (PACKAGE, name))
+            for name in (modules or ('filterpipes', 'filters'))]